@@ -1,16 +1,57 @@
+import argparse
+import asyncio
 import pandas as pd
+import statistics
 import time
+import uuid
+from contextlib import nullcontext
+from functools import partial
 from datetime import datetime
-from sqlalchemy import text
+from sqlalchemy import select
 from sqlalchemy.orm import sessionmaker
-from sqlalchemy.exc import OperationalError
-from db_connection import get_db_connection
+from db_connection import dispose_engines, get_db_connection
+from workbook import read_workbook
 from models import Base
 from models.ECU_version import ECUVersion
-from models.model import Model
-from models.vehicles import Vehicle
+from lookups import get_manufacturer_ids
+from vehicle_index import VehicleIndex
+from scrape_pool import ScrapeTarget, run_scrape_pool
+from ecu_http import SEARCH_URL, fetch_ecu_parts, search_page_url
+from ecu_extract import EXTRACTOR_NAMES, PRODUCT_SELECTOR, configure_extractor, parse_search_page
+from response_cache import configure_response_cache, get_response_cache, DEFAULT_CACHE_DIR, DEFAULT_MAX_AGE
+from ecu_async import AsyncSearchClient, iter_async_results, scrape_targets
+from async_loader import copy_upsert, create_pool
+from scrape_queue import ScrapeQueue
+from writer_thread import WriterThread
+from batch_writer import BatchWriter, quarantine_path
+from bulk_maintenance import deferred_maintenance
 import undetected_chromedriver as uc
-from bs4 import BeautifulSoup
+from selenium.common.exceptions import TimeoutException
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support.ui import WebDriverWait
+
+# Sheet columns this migration reads: {sheet column: (column name used below, dtype)}
+COLUMNS = {
+    "Make": ("Make", "category"),
+    "Model": ("Model", object),
+    "Year": ("Year", None),
+}
+
+NO_RESULTS_SELECTOR = ".no-results, .search-no-results, .no-results-found"
+NO_RESULTS_TEXT = "no results"
+PAGE_LOAD_TIMEOUT = 20  # seconds to wait for results before parsing whatever loaded
+RECYCLE_AFTER = 200  # pages a browser loads before it's replaced
+
+# Requests the lean browser profile drops; only the document and its scripts are needed
+BLOCKED_URL_PATTERNS = [
+    "*.png", "*.jpg", "*.jpeg", "*.gif", "*.webp", "*.svg", "*.ico",
+    "*.css", "*.woff", "*.woff2", "*.ttf", "*.otf", "*.mp4", "*.webm",
+    "*google-analytics.com*", "*googletagmanager.com*", "*doubleclick.net*", "*facebook.net*",
+    "*hotjar.com*", "*bing.com/bat*", "*newrelic.com*", "*nr-data.net*",
+]
+
+# Seconds from driver.get() until results (or "no results") were on the page
+page_load_times = []
 
 def log_message(message):
     print(f"[{datetime.now()}] {message}")
@@ -19,148 +60,442 @@ def get_session(engine):
     Session = sessionmaker(bind=engine)
     return Session()
 
-def ensure_session_alive(session, engine):
-    try:
-        session.execute(text("SELECT 1"))
-        return session
-    except OperationalError:
-        log_message("Session is invalid. Recreating session...")
-        session.rollback()
-        session.close()
-        return get_session(engine)
+def search_results_ready(driver):
+    """Wait condition: product blocks or a "no results" marker are on the page."""
+    if driver.find_elements(By.CSS_SELECTOR, PRODUCT_SELECTOR):
+        return True
+    if driver.find_elements(By.CSS_SELECTOR, NO_RESULTS_SELECTOR):
+        return True
+    # Visible text only, so strings inside scripts can't end the wait early
+    return NO_RESULTS_TEXT in driver.find_element(By.TAG_NAME, "body").text.lower()
 
-def get_vehicle_id(session, model_name, year=None):
-    try:
-        model = session.query(Model).filter(Model.name.ilike(f"%{model_name.strip()}%")).first()
-        if not model:
-            log_message(f"[Warning] No model found matching '{model_name}'")
-            return None
-        vehicle = session.query(Vehicle).filter(Vehicle.model_id == model.id).first()
-        if vehicle:
-            return vehicle.id
-        else:
-            log_message(f"[Warning] No vehicle found for model '{model_name}'")
-    except Exception as e:
-        log_message(f"[Error] get_vehicle_id: {e}")
-        session.rollback()
-    return None
+def log_load_time_summary():
+    """Log the distribution of observed search page load times."""
+    if not page_load_times:
+        return
+    times = sorted(page_load_times)
+    p95 = times[min(len(times) - 1, int(len(times) * 0.95))]
+    log_message(
+        f"Page load times over {len(times)} pages: min {times[0]:.2f}s, median {statistics.median(times):.2f}s, "
+        f"p95 {p95:.2f}s, max {times[-1]:.2f}s, total {sum(times):.1f}s"
+    )
 
-def scrape_ecu_data(make, model, year, driver):
-    base_url = f"https://{make.lower()}.oempartsonline.com/search"
-    url = f"{base_url}?search_str=ECU&make={make}&model={model}&year={year}"
+def scrape_ecu_data(make, model, year, driver, timeout=PAGE_LOAD_TIMEOUT):
+    url = search_page_url(make, model, year)
 
     log_message(f"Scraping ECU for {make} {model} {year} at URL: {url}")
 
     try:
+        started = time.perf_counter()
         driver.get(url)
-        time.sleep(8)
+        WebDriverWait(driver, timeout, poll_frequency=0.2).until(search_results_ready)
+        page_load_times.append(time.perf_counter() - started)
+    except TimeoutException:
+        log_message(f"[Warning] Results did not appear within {timeout}s; parsing what loaded.")
+        page_load_times.append(time.perf_counter() - started)
     except Exception as e:
         log_message(f"[Skipped] Failed to load page: {e}")
-        return []
+        return None
+
+    html = driver.page_source
+    results = parse_search_page(html)
+    # Timeouts, empty results and consent/captcha pages are scraped again next time
+    if results:
+        get_response_cache().put(url, html)
+
+    log_message(f"Found {len(results)} ECU parts")
+    return results
 
-    soup = BeautifulSoup(driver.page_source, "html.parser")
-    product_blocks = soup.select(".product-details-col")
+def load_existing_part_numbers(session):
+    """Return the set of part numbers already stored in ECU_version."""
+    rows = session.execute(select(ECUVersion.part_number).where(ECUVersion.part_number.isnot(None)))
+    return {part_number for (part_number,) in rows}
 
-    results = []
-    for block in product_blocks:
+def insert_ecu_batch(session, records):
+    """
+    Insert ECU rows in one statement, skipping part numbers that already exist.
+    Rows the database rejects are quarantined on their own (see BatchWriter) instead of
+    failing the batch. Returns rows inserted, or None if the batch couldn't be committed.
+    """
+    if not records:
+        return 0
+    writer = BatchWriter(session, ECUVersion, len(records), conflict_columns=["part_number"],
+                         quarantine_file=quarantine_path(ECUVersion.__tablename__))
+    try:
+        inserted = writer.write(records)
+    except Exception:
+        # Already logged and rolled back; the caller marks the batch's targets failed
+        return None
+    present = len(records) - inserted - writer.quarantined
+    log_message(f"[Inserted] {inserted} ECU parts ({present} already present, {writer.quarantined} quarantined)")
+    return inserted
+
+def create_driver(headless=True, lean=True):
+    """
+    Start Chrome for scraping. The lean profile only loads what the results need: no
+    images, stylesheets, fonts, media or trackers (blocked over CDP), no image
+    decoding, a minimal disk cache, and get() returns at DOMContentLoaded since
+    search_results_ready does the waiting.
+    """
+    options = uc.ChromeOptions()
+    options.add_argument("--disable-gpu")
+    options.add_argument("--no-sandbox")
+    if headless:
+        options.add_argument("--headless=new")
+    if lean:
+        options.page_load_strategy = "eager"
+        options.add_argument("--blink-settings=imagesEnabled=false")
+        options.add_argument("--disk-cache-size=1")
+        options.add_argument("--media-cache-size=1")
+        options.add_argument("--disable-extensions")
+        options.add_argument("--disable-background-networking")
+        options.add_experimental_option("prefs", {"profile.managed_default_content_settings.images": 2})
+
+    driver = uc.Chrome(version_main=137, options=options)
+    if lean:
+        driver.execute_cdp_cmd("Network.enable", {})
+        driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": BLOCKED_URL_PATTERNS})
+    return driver
+
+def build_scrape_targets(df_vehicles, vehicle_index, manufacturer_ids):
+    """Match each deduplicated workbook row to a vehicle and return the targets to scrape."""
+    targets = []
+    for idx, row in df_vehicles.iterrows():
+        model, year, make = row.get("Model"), row.get("Year"), row.get("Make")
+        # Empty cells come back as NaN, which is truthy
+        if not all(pd.notna(value) and str(value).strip() for value in (model, year, make)):
+            log_message(f"[Skipped] Missing required fields at row {idx}")
+            continue
+        model, make = str(model).strip(), str(make).strip()
         try:
-            title_el = block.select_one(".product-title a h2")
-            part_number_el = block.select_one(".catalog-product-id a")
+            year = int(year)
+        except (TypeError, ValueError):
+            log_message(f"[Skipped] Invalid year at row {idx}: {year!r}")
+            continue
+
+        vehicle_id = vehicle_index.find(model, manufacturer_ids.get(make), year)
+        if vehicle_id is None:
+            log_message(f"[Skipped] No vehicle_id found for row {idx}: Model={model}, Year={year}, Make={make}")
+            continue
+
+        targets.append(ScrapeTarget(make, model, year, vehicle_id))
+    return targets
+
+def scrape_target(target, get_driver, fast_path=True):
+    """
+    Parse the cached page if there is one; otherwise try the plain HTTP fast path and
+    load the page in Chrome only if it's blocked or finds nothing.
+    """
+    cached = get_response_cache().get(search_page_url(target.make, target.model, target.year))
+    if cached is not None:
+        return parse_search_page(cached)
+
+    if fast_path:
+        parts = fetch_ecu_parts(target.make, target.model, target.year)
+        if parts:
+            return parts
+    return scrape_ecu_data(target.make, target.model, target.year, get_driver())
+
+def replay_results(targets):
+    """
+    Yield (target, parts) from cached pages only. Targets that were never captured are
+    skipped, not reported as having no parts: a queued one stays claimed until the run
+    releases it, so a later live run still scrapes it.
+    """
+    cache = get_response_cache()
+    missing = 0
+    for target in targets:
+        html = cache.get(search_page_url(target.make, target.model, target.year))
+        if html is None:
+            missing += 1
+            continue
+        yield target, parse_search_page(html)
+    log_message(f"Replayed {len(targets) - missing} cached pages; {missing} targets were not in the cache")
+
+def scrape_results(targets, backend="browser", workers=1, per_host_limit=2, headless=True, lean=True,
+                   recycle_after=RECYCLE_AFTER, fast_path=True, search_url=SEARCH_URL, browser_fallback=True):
+    """
+    Scrape `targets` and yield (target, parts) in the calling thread; parts is None for
+    targets that couldn't be scraped.
+
+    backend="browser": `workers` threads, at most `per_host_limit` of them on any one
+    <make>.oempartsonline.com host. With `fast_path`, each search is first fetched over
+    plain HTTP and parsed from the page's tracking JSON, and a browser is only started
+    for targets where that fails. Browsers use the lean profile unless `lean` is off,
+    and each is replaced after `recycle_after` pages.
 
-            part = {
-                "name": title_el.text.strip() if title_el else None,
-                "part_number": part_number_el.text.strip() if part_number_el else None,
-            }
+    backend="async": every search goes through the asyncio client (`search_url` can
+    point it at a stub server); targets it can't serve are retried in the browser pool
+    when `browser_fallback` is set.
 
-            if part["name"] and part["part_number"]:
-                results.append(part)
+    Pages come from the response cache when it has them; in replay mode nothing else
+    is consulted, and targets without a cached page aren't yielded at all.
+    """
+    make_driver = partial(create_driver, headless, lean)
+
+    if get_response_cache().replay:
+        yield from replay_results(targets)
+    elif backend == "async":
+        fallback = []
+        for target, parts in iter_async_results(targets, search_url=search_url, limit_per_host=per_host_limit):
+            if parts is None:
+                fallback.append(target)
             else:
-                log_message("[Warning] Incomplete part skipped.")
+                yield target, parts
+        if fallback and browser_fallback:
+            log_message(f"Retrying {len(fallback)} targets in the browser")
+            yield from run_scrape_pool(fallback, partial(scrape_target, fast_path=False), make_driver,
+                                       workers, per_host_limit, recycle_after)
+        else:
+            for target in fallback:
+                yield target, None
+    else:
+        yield from run_scrape_pool(targets, partial(scrape_target, fast_path=fast_path), make_driver,
+                                   workers, per_host_limit, recycle_after)
+
+def new_ecu_records(target, ecus, existing_part_numbers):
+    """ECU_version rows for a target's scraped parts, skipping (and then remembering) known part numbers."""
+    records = []
+    for ecu in ecus:
+        part_number = ecu["part_number"]
+
+        # Check if already exists
+        if part_number in existing_part_numbers:
+            log_message(f"[Duplicate] Skipped {part_number}")
+            continue
+        existing_part_numbers.add(part_number)
+
+        records.append({
+            "id": uuid.uuid4(),
+            "vehicle_id": target.vehicle_id,
+            "name": ecu["name"],
+            "part_number": part_number,
+            "created_at": datetime.now(),
+            "updated_at": datetime.now(),
+        })
+    return records
+
+async def scrape_and_load_async(targets, existing_part_numbers, work_queue=None, batch_size=500, max_writes=2,
+                                max_pending=100, **client_options):
+    """
+    Scrape `targets` with the asyncio client and COPY their parts into ECU_version
+    through an asyncpg pool, all on one event loop: while one batch is being copied
+    the loop keeps awaiting search pages. At most `max_pending` searches are under way
+    and at most `max_writes` copies run at once; when both copy slots are busy no new
+    search starts until one frees up, so scraped parts can't pile up in memory.
+
+    If the scrape fails, the copies already started are awaited and the targets of the
+    batch not yet written are marked failed before the error is raised. Returns the
+    targets the client couldn't fetch, for the browser to retry.
+    """
+    pool = await create_pool(bulk=True, max_size=max_writes)
+    write_slots = asyncio.Semaphore(max_writes)
+    writes = set()
+    fallback = []
+    batch, batch_targets = [], []
+    columns = ["id", "vehicle_id", "name", "part_number", "created_at", "updated_at"]
+
+    async def write(records, done_targets):
+        try:
+            inserted = await copy_upsert(pool, ECUVersion.__tablename__, columns,
+                                         [tuple(record[c] for c in columns) for record in records],
+                                         conflict_columns=["part_number"])
+            log_message(f"[Inserted] {inserted} ECU parts ({len(records) - inserted} already present)")
+            if work_queue:
+                work_queue.mark_done(done_targets)
         except Exception as e:
-            log_message(f"[Warning] Block error: {e}")
+            log_message(f"[Error] COPY of {len(records)} ECU parts failed: {e}")
+            existing_part_numbers.difference_update(record["part_number"] for record in records)
+            if work_queue:
+                work_queue.mark_failed(done_targets, "ECU insert failed")
+        finally:
+            write_slots.release()
 
-    log_message(f"Found {len(results)} ECU parts")
-    return results
+    async def submit():
+        nonlocal batch, batch_targets
+        if not batch_targets:
+            return
+        await write_slots.acquire()
+        task = asyncio.create_task(write(batch, batch_targets))
+        writes.add(task)
+        task.add_done_callback(writes.discard)
+        batch, batch_targets = [], []
+
+    try:
+        async with AsyncSearchClient(**client_options) as client:
+            try:
+                async for target, parts in scrape_targets(targets, client, max_pending):
+                    if parts is None:
+                        fallback.append(target)
+                        continue
+                    batch.extend(new_ecu_records(target, parts, existing_part_numbers))
+                    batch_targets.append(target)
+                    if len(batch) >= batch_size:
+                        await submit()
+                await submit()
+            except Exception as e:
+                log_message(f"[Error] Async scrape failed: {e}")
+                existing_part_numbers.difference_update(record["part_number"] for record in batch)
+                if work_queue and batch_targets:
+                    work_queue.mark_failed(batch_targets, f"Async scrape failed: {e}")
+                raise
+            finally:
+                # Copies already under way finish (and settle their targets) either way
+                await asyncio.gather(*writes)
+            client.log_timing_summary()
+    finally:
+        await pool.close()
+    return fallback
+
+def migrate_ecu_data_from_excel(vehicle_excel_path, batch_size=500, queue_path=None, retry_failed=False,
+                                claim_size=500, defer_constraints=False, async_db=False, **scrape_options):
+    """
+    Scrape ECU parts for every workbook vehicle and store them in ECU_version.
 
-def migrate_ecu_data_from_excel(vehicle_excel_path):
+    Scraping runs as configured by `scrape_options` (see scrape_results). This thread
+    deduplicates the parts and hands them to a WriterThread, which inserts them in
+    batches while scraping continues; if it falls behind, its full queue holds this
+    thread (and so the scrapers) back. With `queue_path`, targets go through a durable
+    ScrapeQueue: a target is marked done only once its parts are committed, so a
+    restarted run (or another process sharing the file) picks up just the outstanding
+    work. `defer_constraints` drops ECU_version's foreign key (and any secondary
+    index but the part_number one) until the load is done. `async_db` scrapes with
+    the asyncio client and loads through asyncpg on one event loop (see
+    scrape_and_load_async); only targets it couldn't fetch go to the browser pool.
+    """
     engine = get_db_connection()
     session = get_session(engine)
     Base.metadata.create_all(engine)
 
-    options = uc.ChromeOptions()
-    options.add_argument("--disable-gpu")
-    options.add_argument("--no-sandbox")
+    work_queue = ScrapeQueue(queue_path) if queue_path else None
+    writer = WriterThread(partial(get_session, engine), insert_ecu_batch, batch_size, name="ECU writer").start()
+    existing_part_numbers = set()
 
-    driver = uc.Chrome(version_main=137, options=options)
+    def settle(outcomes):
+        for targets, records, inserted in outcomes:
+            if inserted is None:
+                # Let a later attempt insert these part numbers
+                existing_part_numbers.difference_update(record["part_number"] for record in records)
+                if work_queue:
+                    work_queue.mark_failed(targets, "ECU insert failed")
+            elif work_queue:
+                work_queue.mark_done(targets)
 
     try:
-        df_vehicles = pd.read_excel(vehicle_excel_path)
+        df_vehicles = read_workbook(vehicle_excel_path, COLUMNS)
         log_message(f"Loaded {len(df_vehicles)} rows from Excel")
 
         df_vehicles = df_vehicles.drop_duplicates(subset=["Model", "Year", "Make"])
         log_message(f"After dropping duplicates, {len(df_vehicles)} rows remain")
 
-        vehicle_cache = {}
-
-        for idx, row in df_vehicles.iterrows():
-            model = str(row.get("Model")).strip()
-            year = row.get("Year")
-            make = str(row.get("Make")).strip()
-
-            log_message(f"Row {idx}: Model={model}, Year={year}, Make={make}")
-
-            if not all([model, year, make]):
-                log_message(f"[Skipped] Missing required fields at row {idx}")
-                continue
+        vehicle_index = VehicleIndex.load(session)
+        manufacturer_ids = get_manufacturer_ids(session, df_vehicles["Make"].dropna().astype(str).str.strip().unique())
+        existing_part_numbers.update(load_existing_part_numbers(session))
+        log_message(f"{len(existing_part_numbers)} ECU part numbers already stored")
 
-            cache_key = f"{model}|{year}"
-            vehicle_id = vehicle_cache.get(cache_key)
-
-            if not vehicle_id:
-                session = ensure_session_alive(session, engine)
-                vehicle_id = get_vehicle_id(session, model, year)
-                if vehicle_id is None:
-                    log_message(f"[Skipped] No vehicle_id found for row {idx}")
-                    continue
-                vehicle_cache[cache_key] = vehicle_id
-
-            ecus = scrape_ecu_data(make, model, year, driver)
+        targets = build_scrape_targets(df_vehicles, vehicle_index, manufacturer_ids)
+        if work_queue:
+            work_queue.add(targets)
+            if retry_failed:
+                work_queue.retry_failed()
+            work_queue.retire_missing(targets)
+            work_queue.log_progress()
+            chunks = work_queue.drain(claim_size)
+        else:
+            chunks = [targets]
 
-            for ecu in ecus:
-                part_number = ecu["part_number"]
+        # End the preload's read transaction so the deferred DDL isn't stuck behind it
+        session.commit()
+        # ON CONFLICT (part_number) needs its unique index, so that one stays
+        maintenance = (deferred_maintenance(engine, ECUVersion.__tablename__, keep_columns=["part_number"])
+                       if defer_constraints else nullcontext())
+        with maintenance:
+            for chunk in chunks:
+                chunk_options = scrape_options
+                if async_db and not get_response_cache().replay:
+                    chunk = asyncio.run(scrape_and_load_async(
+                        chunk, existing_part_numbers, work_queue, batch_size,
+                        search_url=scrape_options.get("search_url", SEARCH_URL),
+                        limit_per_host=scrape_options.get("per_host_limit", 2),
+                    ))
+                    if chunk and not scrape_options.get("browser_fallback", True):
+                        if work_queue:
+                            work_queue.mark_failed(chunk, "No page could be scraped")
+                        chunk = []
+                    if not chunk:
+                        continue
+                    log_message(f"Retrying {len(chunk)} targets in the browser")
+                    chunk_options = {**scrape_options, "backend": "browser", "fast_path": False}
 
-                # Check if already exists
-                if session.query(ECUVersion).filter_by(part_number=part_number).first():
-                    log_message(f"[Duplicate] Skipped {part_number}")
-                    continue
+                for target, ecus in scrape_results(chunk, **chunk_options):
+                    if ecus is None:
+                        if work_queue:
+                            work_queue.mark_failed([target], "No page could be scraped")
+                        continue
 
-                ecu_record = ECUVersion(
-                    vehicle_id=vehicle_id,
-                    name=ecu["name"],
-                    part_number=part_number,
-                    created_at=datetime.now(),
-                    updated_at=datetime.now()
-                )
+                    writer.put(target, new_ecu_records(target, ecus, existing_part_numbers))
+                    settle(writer.completed())
 
-                try:
-                    session.add(ecu_record)
-                    session.commit()
-                    log_message(f"[Inserted] {part_number} for {make} {model} {year}")
-                except Exception as e:
-                    session.rollback()
-                    log_message(f"[Error] Insert failed for {part_number}: {e}")
+            # Wait for the last batches to be written
+            settle(writer.close())
 
+        log_load_time_summary()
         log_message("✅ ECU data migration completed.")
 
     except Exception as e:
         log_message(f"[Error] Migration failed: {e}")
         session.rollback()
+        # Keep the parts already scraped
+        settle(writer.close())
+        raise
     finally:
-        try:
-            driver.quit()
-        except Exception:
-            pass
         session.close()
+        if work_queue:
+            work_queue.release()
+            work_queue.close()
 
 if __name__ == "__main__":
-    migrate_ecu_data_from_excel("../data/teoalida_data.xlsx")
+    parser = argparse.ArgumentParser(description="Scrape ECU parts for the workbook's vehicles.")
+    parser.add_argument("file_path", nargs="?", default="../data/teoalida_data.xlsx")
+    parser.add_argument("--workers", type=int, default=1, help="Number of browser workers.")
+    parser.add_argument("--per-host", type=int, default=2, help="Concurrent page loads allowed per host.")
+    parser.add_argument("--headed", action="store_true", help="Show the browser windows instead of running headless.")
+    parser.add_argument("--full-pages", action="store_true",
+                        help="Let the browsers load images, stylesheets, fonts and trackers.")
+    parser.add_argument("--recycle-after", type=int, default=RECYCLE_AFTER,
+                        help="Pages a browser loads before it's restarted (0 never restarts).")
+    parser.add_argument("--browser-only", action="store_true", help="Skip the plain HTTP fast path.")
+    parser.add_argument("--backend", choices=["browser", "async"], default="browser",
+                        help="Scrape with the browser pool or the asyncio HTTP client.")
+    parser.add_argument("--search-url", default=SEARCH_URL,
+                        help="Search URL template for the async backend, formatted with {host}.")
+    parser.add_argument("--replay", action="store_true",
+                        help="Serve every search page from the response cache; never touch the network.")
+    parser.add_argument("--no-cache", action="store_true", help="Don't read or write the response cache.")
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR, help="Response cache directory.")
+    parser.add_argument("--cache-max-age", type=float, default=DEFAULT_MAX_AGE / 3600,
+                        help="Hours a cached page is reused before it's fetched again (0 keeps pages forever).")
+    parser.add_argument("--extractor", choices=["auto", *EXTRACTOR_NAMES], default="auto",
+                        help="HTML backend for product blocks when a page has no tracking JSON "
+                             "(one that isn't installed falls back to the fastest that is).")
+    parser.add_argument("--queue", help="SQLite work queue file; lets an interrupted run resume and several "
+                                         "processes share the work.")
+    parser.add_argument("--retry-failed", action="store_true", help="Re-queue targets that ran out of attempts.")
+    parser.add_argument("--defer-constraints", action="store_true",
+                        help="Drop the foreign key during the load and validate it at the end.")
+    parser.add_argument("--async-db", action="store_true",
+                        help="Scrape with the asyncio client and load through asyncpg on one event loop.")
+    args = parser.parse_args()
+
+    configure_extractor(args.extractor)
+    configure_response_cache(directory=args.cache_dir, max_age=args.cache_max_age * 3600 or None,
+                             replay=args.replay, enabled=not args.no_cache)
+    try:
+        migrate_ecu_data_from_excel(args.file_path, workers=args.workers, per_host_limit=args.per_host,
+                                    headless=not args.headed, lean=not args.full_pages,
+                                    recycle_after=args.recycle_after, fast_path=not args.browser_only,
+                                    backend=args.backend, search_url=args.search_url,
+                                    queue_path=args.queue, retry_failed=args.retry_failed,
+                                    defer_constraints=args.defer_constraints, async_db=args.async_db)
+    finally:
+        dispose_engines()
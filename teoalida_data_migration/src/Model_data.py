@@ -6,11 +6,22 @@ from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy import Date
 from sqlalchemy import text
 from models import Base
-from models.manufacturer import Manufacturer
 from models.model import Model
-from db_connection import get_db_connection
+from db_connection import dispose_engines, get_db_connection
+from bulk_loader import psql_insert_copy
+from workbook import read_workbook, column_mapping
+from lookups import get_manufacturer_ids
 from utils import log_message
 
+# Sheet columns this migration reads: {sheet column: (table column, dtype)}
+COLUMNS = {
+    "Make": ("manufacturer_short_name", "category"),
+    "Model": ("name", object),
+    "Year": ("year", None),
+    "Country of origin": ("operating_country", "category"),
+    "Trim (description)": ("description", object),
+}
+
 
 def get_valid_countries(session):
     result = session.execute(text("SELECT unnest(enum_range(NULL::countries))")).fetchall()
@@ -20,15 +31,7 @@ def get_valid_countries(session):
 def transform_model_data(data, session):
     log_message("Transforming Model data...")
 
-    column_mapping = {
-        "Make": "manufacturer_short_name",
-        "Model": "name",
-        "Year": "year",
-        "Country of origin": "operating_country",
-        "Trim (description)": "description"
-    }
-
-    data.rename(columns=column_mapping, inplace=True)
+    data.rename(columns=column_mapping(COLUMNS), inplace=True)
 
     required_columns = ["id", "manufacturer", "name", "year", "operating_country", "description"]
 
@@ -38,19 +41,13 @@ def transform_model_data(data, session):
 
     data["id"] = data["id"].apply(lambda x: uuid.uuid4() if pd.isna(x) else uuid.UUID(str(x)))
 
-    manufacturer_ids = []
-    for manufacturer_short_name in data["manufacturer_short_name"]:
-        if pd.isna(manufacturer_short_name):
-            manufacturer_ids.append(None)
-            continue
-        manufacturer = session.query(Manufacturer).filter_by(short_name=manufacturer_short_name).first()
-        if manufacturer:
-            manufacturer_ids.append(manufacturer.id)
-        else:
+    short_names = data["manufacturer_short_name"].dropna().unique()
+    manufacturer_ids = get_manufacturer_ids(session, short_names)
+    for manufacturer_short_name in short_names:
+        if manufacturer_short_name not in manufacturer_ids:
             log_message(f"Manufacturer '{manufacturer_short_name}' not found.")
-            manufacturer_ids.append(None)
 
-    data["manufacturer"] = [uuid.UUID(str(x)) if x else None for x in manufacturer_ids]
+    data["manufacturer"] = data["manufacturer_short_name"].astype(object).map(manufacturer_ids)
     valid_countries = get_valid_countries(session)
     data["operating_country"] = data["operating_country"].astype(str).str.extract(r'/?([A-Za-z\s]+)$')[0].str.strip()
     data["operating_country"] = data["operating_country"].apply(
@@ -67,10 +64,9 @@ def transform_model_data(data, session):
 def migrate_models(file_path):
     try:
         log_message("Loading Excel data...")
-        data = pd.read_excel(file_path)
-        data = data.drop_duplicates()
+        data = read_workbook(file_path, COLUMNS, unique_rows=True)
 
-        engine = get_db_connection()
+        engine = get_db_connection("bulk")
         Session = sessionmaker(bind=engine)
         session = Session()
 
@@ -87,7 +83,7 @@ def migrate_models(file_path):
             con=engine,
             if_exists="append",
             index=False,
-            chunksize=1000,
+            method=psql_insert_copy,
             dtype={
                 "id": UUID,
                 "manufacturer": UUID,
@@ -106,4 +102,7 @@ def migrate_models(file_path):
             session.close()
 
 if __name__ == "__main__":
-    migrate_models("../data/teoalida_data.xlsx")
+    try:
+        migrate_models("../data/teoalida_data.xlsx")
+    finally:
+        dispose_engines()
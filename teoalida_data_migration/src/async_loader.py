@@ -0,0 +1,54 @@
+import asyncpg
+from bulk_loader import quote_identifier
+from db_connection import BULK_SETTINGS, load_config
+
+# Only the ECU stage loads through here (ECU_version.scrape_and_load_async): it is the
+# one stage that waits on the network, so that is where overlapping the wait with
+# COPY pays. The workbook stages have nothing to interleave and stay on the
+# synchronous loaders in bulk_loader.
+STAGING_TABLE = "copy_staging"
+
+
+async def create_pool(bulk=False, min_size=1, max_size=4):
+    """
+    asyncpg pool for the configured database (config.json plus TEOALIDA_DB_* overrides,
+    so tests can point it at a local Postgres). `bulk` applies the same session
+    settings as get_db_connection("bulk").
+    """
+    config = load_config()
+    return await asyncpg.create_pool(
+        user=config["user"],
+        password=config["password"],
+        host=config["host"],
+        port=int(config["port"]),
+        database=config["dbname"],
+        min_size=min_size,
+        max_size=max_size,
+        server_settings=dict(BULK_SETTINGS) if bulk else None,
+    )
+
+
+async def copy_upsert(pool, table, columns, records, conflict_columns=None):
+    """
+    Load `records` (tuples in `columns` order) into `table` with binary COPY.
+
+    The rows are copied into a temporary table dropped at commit, then moved over with
+    one INSERT ... SELECT ... ON CONFLICT DO NOTHING, so rows that already exist are
+    skipped the way the synchronous upserts skip them. Returns rows inserted.
+    """
+    if not records:
+        return 0
+    column_list = ", ".join(quote_identifier(column) for column in columns)
+    conflict = f"({', '.join(quote_identifier(c) for c in conflict_columns)})" if conflict_columns else ""
+    async with pool.acquire() as connection:
+        async with connection.transaction():
+            await connection.execute(
+                f"CREATE TEMP TABLE {STAGING_TABLE} (LIKE {quote_identifier(table)} INCLUDING DEFAULTS) ON COMMIT DROP"
+            )
+            await connection.copy_records_to_table(STAGING_TABLE, records=records, columns=list(columns))
+            status = await connection.execute(
+                f"INSERT INTO {quote_identifier(table)} ({column_list}) SELECT {column_list} FROM {STAGING_TABLE} "
+                f"ON CONFLICT {conflict} DO NOTHING"
+            )
+    # Status is "INSERT 0 <rows>"
+    return int(status.split()[-1])
@@ -0,0 +1,113 @@
+import json
+import os
+import threading
+from datetime import datetime
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.exc import DataError, IntegrityError
+from utils import log_message
+
+QUARANTINE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "data", "quarantine")
+
+# Errors caused by the rows themselves; anything else (lost connection, bad SQL) is raised
+ROW_ERRORS = (IntegrityError, DataError)
+
+_quarantine_lock = threading.Lock()
+
+
+def quarantine_path(table_name):
+    return os.path.join(QUARANTINE_DIR, f"{table_name}.jsonl")
+
+
+class BatchWriter:
+    """
+    Inserts rows in multi-row statements and commits once per batch of `batch_size`.
+
+    Each batch is tried inside a savepoint. If it fails because of its rows, it is
+    split in half and each half retried the same way, so only the offending rows
+    (found in about log2(batch_size) extra statements each) are left out. Those are
+    logged and, with `quarantine_file`, appended there as JSON lines with the error once
+    the rest of the batch is committed. Any other error, or a batch whose rows are all
+    rejected, is raised.
+    """
+
+    def __init__(self, session, table, batch_size=500, conflict_columns=None, quarantine_file=None):
+        self.session = session
+        self.table = table
+        self.batch_size = batch_size
+        self.conflict_columns = conflict_columns
+        self.quarantine_file = quarantine_file
+        self.pending = []
+        self.written = 0
+        self.quarantined = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        if exc_type is None:
+            self.flush()
+
+    def add(self, record):
+        self.pending.append(record)
+        if len(self.pending) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        records, self.pending = self.pending, []
+        return self.write(records)
+
+    def write(self, records):
+        """
+        Insert and commit `records` now and return the rows written.
+
+        Raises (after rolling back) on errors that aren't about single rows, and when
+        every row of the batch is rejected, since then the rows aren't what's wrong.
+        """
+        if not records:
+            return 0
+        rejected = []
+        try:
+            written = self._insert(records, rejected)
+            if len(rejected) == len(records):
+                raise rejected[0][1]
+            self.session.commit()
+        except Exception as e:
+            self.session.rollback()
+            log_message(f"[Error] Batch of {len(records)} rows for {self._name()} failed: {e}")
+            raise
+        for record, error in rejected:
+            self._quarantine(record, error)
+        self.written += written
+        return written
+
+    def _statement(self, records):
+        statement = insert(self.table).values(records)
+        if self.conflict_columns:
+            statement = statement.on_conflict_do_nothing(index_elements=self.conflict_columns)
+        return statement
+
+    def _insert(self, records, rejected):
+        try:
+            with self.session.begin_nested():
+                return self.session.execute(self._statement(records)).rowcount
+        except ROW_ERRORS as e:
+            if len(records) == 1:
+                rejected.append((records[0], e))
+                return 0
+            middle = len(records) // 2
+            return self._insert(records[:middle], rejected) + self._insert(records[middle:], rejected)
+
+    def _quarantine(self, record, error):
+        self.quarantined += 1
+        message = str(getattr(error, "orig", error)).strip()
+        log_message(f"[Quarantined] {self._name()} row: {message}")
+        if self.quarantine_file:
+            line = json.dumps({"table": self._name(), "error": message, "at": datetime.now(), "row": record},
+                              default=str)
+            with _quarantine_lock:
+                os.makedirs(os.path.dirname(self.quarantine_file), exist_ok=True)
+                with open(self.quarantine_file, "a", encoding="utf-8") as file:
+                    file.write(line + "\n")
+
+    def _name(self):
+        return getattr(self.table, "__tablename__", getattr(self.table, "name", str(self.table)))
@@ -0,0 +1,70 @@
+import argparse
+import glob
+import gzip
+import os
+import time
+from ecu_extract import EXTRACTORS, UNAVAILABLE_EXTRACTORS, extract_tracking_products, parse_product_blocks, products_to_parts
+from response_cache import DEFAULT_CACHE_DIR
+from utils import log_message
+
+
+def load_pages(cache_dir, limit=None):
+    """Read saved search pages from the response cache directory."""
+    paths = sorted(glob.glob(os.path.join(cache_dir, "*", "*.html.gz")) +
+                   glob.glob(os.path.join(cache_dir, "*", "*.html")))
+    pages = []
+    for path in paths[:limit]:
+        opener = gzip.open if path.endswith(".gz") else open
+        with opener(path, "rt", encoding="utf-8") as file:
+            pages.append(file.read())
+    return pages
+
+
+def parse_tracking(html):
+    products = extract_tracking_products(html)
+    return products_to_parts(products) if products else []
+
+
+def time_parser(parse, pages, repeat):
+    """Best-of-`repeat` seconds to parse every page, and the parts from the last pass."""
+    best, results = None, None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        results = [parse(html) for html in pages]
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best, results
+
+
+def run_benchmark(cache_dir=DEFAULT_CACHE_DIR, repeat=5, limit=None):
+    pages = load_pages(cache_dir, limit)
+    if not pages:
+        log_message(f"No saved pages under {cache_dir}; run the ECU scraper with the response cache enabled first.")
+        return
+    log_message(f"Benchmarking {len(pages)} pages ({sum(len(p) for p in pages) / 1e6:.1f} MB), best of {repeat}")
+
+    for name, reason in UNAVAILABLE_EXTRACTORS.items():
+        log_message(f"Skipping {name}: {reason}")
+    parsers = {name: (lambda html, name=name: parse_product_blocks(html, name)) for name in EXTRACTORS}
+    parsers["tracking"] = parse_tracking
+
+    timings = {name: time_parser(parse, pages, repeat) for name, parse in parsers.items()}
+    baseline_seconds, baseline_results = timings["bs4"]
+    for name, (seconds, results) in timings.items():
+        # The tracking JSON can name parts differently from the rendered blocks, so only compare HTML backends
+        mismatches = "" if name == "tracking" else \
+            f", {sum(a != b for a, b in zip(results, baseline_results))} pages differ from bs4"
+        log_message(
+            f"{name:>10}: {seconds * 1000 / len(pages):.2f} ms/page, {baseline_seconds / seconds:.1f}x bs4, "
+            f"{sum(len(parts) for parts in results)} parts{mismatches}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Time the ECU search page extractors over saved pages.")
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR, help="Response cache directory to read pages from.")
+    parser.add_argument("--repeat", type=int, default=5, help="Passes per extractor; the fastest is reported.")
+    parser.add_argument("--limit", type=int, help="Only use the first N pages.")
+    args = parser.parse_args()
+
+    run_benchmark(args.cache_dir, args.repeat, args.limit)
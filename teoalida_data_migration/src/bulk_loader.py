@@ -0,0 +1,149 @@
+import csv
+import io
+import math
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime
+import pandas as pd
+from utils import log_message
+
+# NULL marker used in the CSV stream; unquoted empty fields stay empty strings
+NULL = "\\N"
+
+
+def quote_identifier(name):
+    """Quote a table or column name for PostgreSQL (tables like "ECU_version" are case sensitive)."""
+    return '"' + str(name).replace('"', '""') + '"'
+
+
+def _table_name(table, schema=None):
+    return f"{quote_identifier(schema)}.{quote_identifier(table)}" if schema else quote_identifier(table)
+
+
+def format_copy_value(value):
+    """Convert a Python/pandas value to its text form for COPY ... CSV."""
+    if value is None or value is pd.NA or value is pd.NaT:
+        return NULL
+    if isinstance(value, float):
+        if math.isnan(value):
+            return NULL
+        # Whole floats come from int columns that went through NaN; "2.0" is not a valid integer literal
+        return str(int(value)) if value.is_integer() else repr(value)
+    if isinstance(value, uuid.UUID):
+        return str(value)
+    if isinstance(value, (datetime, date)):
+        return value.isoformat(sep=" ") if isinstance(value, datetime) else value.isoformat()
+    return value
+
+
+def copy_rows(dbapi_connection, table, columns, rows, schema=None, chunk_rows=50000):
+    """
+    Stream an iterable of row tuples into `table` with COPY FROM STDIN (CSV format).
+
+    Rows are buffered `chunk_rows` at a time, so memory stays bounded for long iterators.
+    Uses the caller's transaction; nothing is committed here. Returns the row count.
+    """
+    sql = (f"COPY {_table_name(table, schema)} ({', '.join(quote_identifier(c) for c in columns)}) "
+           f"FROM STDIN WITH (FORMAT csv, NULL '{NULL}')")
+
+    total = 0
+    with dbapi_connection.cursor() as cursor:
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        buffered = 0
+        for row in rows:
+            writer.writerow([format_copy_value(value) for value in row])
+            buffered += 1
+            if buffered >= chunk_rows:
+                buffer.seek(0)
+                cursor.copy_expert(sql, buffer)
+                total += buffered
+                buffer = io.StringIO()
+                writer = csv.writer(buffer)
+                buffered = 0
+        if buffered:
+            buffer.seek(0)
+            cursor.copy_expert(sql, buffer)
+            total += buffered
+    return total
+
+
+def copy_dataframe(engine, table, data, columns=None, schema=None):
+    """COPY a DataFrame (or a subset of its columns) into an existing table in one transaction."""
+    columns = list(columns) if columns is not None else list(data.columns)
+    raw_connection = engine.raw_connection()
+    try:
+        count = copy_rows(raw_connection, table, columns, data[columns].itertuples(index=False, name=None), schema)
+        raw_connection.commit()
+    except Exception:
+        raw_connection.rollback()
+        raise
+    finally:
+        raw_connection.close()
+    log_message(f"Copied {count} rows into {table}")
+    return count
+
+
+def partition_frame(data, partitions, key_columns=None):
+    """Split a DataFrame into `partitions` parts by a hash of `key_columns` (default: every column)."""
+    keys = data[list(key_columns)] if key_columns is not None else data
+    buckets = pd.util.hash_pandas_object(keys, index=False).to_numpy() % partitions
+    return [data[buckets == number] for number in range(partitions)]
+
+
+def parallel_copy_dataframe(engine, table, data, partitions=4, columns=None, schema=None, key_columns=None):
+    """
+    COPY a DataFrame into `table` over `partitions` connections at once, all or nothing.
+
+    Rows are split by a hash of `key_columns` and each part is COPYed by its own
+    thread on its own connection, so the server loads them on separate backends. The
+    threads meet at a barrier before committing: if any COPY failed, every
+    connection rolls back. (A commit failing after another has succeeded is not
+    covered; that would need two-phase commit.) Returns the total row count.
+    """
+    columns = list(columns) if columns is not None else list(data.columns)
+    parts = [part for part in partition_frame(data, partitions, key_columns) if len(part)]
+    if len(parts) <= 1:
+        return copy_dataframe(engine, table, data, columns, schema)
+
+    barrier = threading.Barrier(len(parts))
+    failures = []
+
+    def load(part):
+        raw_connection, count = None, 0
+        try:
+            raw_connection = engine.raw_connection()
+            count = copy_rows(raw_connection, table, columns, part[columns].itertuples(index=False, name=None), schema)
+        except Exception as e:
+            failures.append(e)
+        # Every partition has loaded (or failed) before anyone decides
+        barrier.wait()
+        if raw_connection is None:
+            return 0
+        try:
+            if failures:
+                raw_connection.rollback()
+            else:
+                raw_connection.commit()
+            return count
+        finally:
+            raw_connection.close()
+
+    with ThreadPoolExecutor(max_workers=len(parts)) as executor:
+        counts = list(executor.map(load, parts))
+
+    if failures:
+        raise RuntimeError(f"Parallel COPY into {table} rolled back: {failures[0]}") from failures[0]
+    log_message(f"Copied {sum(counts)} rows into {table} over {len(parts)} connections")
+    return sum(counts)
+
+
+def psql_insert_copy(table, conn, keys, data_iter):
+    """
+    `method` for DataFrame.to_sql that loads each chunk with COPY instead of INSERT.
+
+    to_sql still creates the table and applies its dtype mapping, so existing calls only
+    need `method=psql_insert_copy` to switch loaders.
+    """
+    return copy_rows(conn.connection, table.name, keys, data_iter, table.schema)
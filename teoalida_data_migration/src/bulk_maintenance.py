@@ -0,0 +1,148 @@
+import time
+from contextlib import contextmanager
+from bulk_loader import quote_identifier
+from utils import log_message
+
+# Secondary indexes, with the unique/exclusion constraint each one backs (if any).
+# Indexes a foreign key elsewhere depends on are left alone.
+SECONDARY_INDEXES = """
+SELECT c.relname,
+       pg_get_indexdef(i.indexrelid),
+       con.conname,
+       pg_get_constraintdef(con.oid),
+       ARRAY(SELECT a.attname::text FROM unnest(i.indkey) AS k(attnum)
+             JOIN pg_attribute a ON a.attrelid = i.indrelid AND a.attnum = k.attnum)
+FROM pg_index i
+JOIN pg_class c ON c.oid = i.indexrelid
+LEFT JOIN pg_constraint con ON con.conindid = i.indexrelid AND con.conrelid = i.indrelid AND con.contype IN ('u', 'x')
+WHERE i.indrelid = %(table)s::regclass
+  AND NOT i.indisprimary
+  AND NOT EXISTS (SELECT 1 FROM pg_constraint f WHERE f.contype = 'f' AND f.conindid = i.indexrelid)
+"""
+
+FOREIGN_KEYS = """
+SELECT conname, pg_get_constraintdef(oid)
+FROM pg_constraint
+WHERE conrelid = %(table)s::regclass AND contype = 'f'
+"""
+
+
+def _execute_all(raw_connection, statements):
+    with raw_connection.cursor() as cursor:
+        for statement in statements:
+            cursor.execute(statement)
+    raw_connection.commit()
+
+
+def _execute_each(raw_connection, statements):
+    """Run each statement in its own transaction; return [(statement, error)] for those that failed."""
+    failures = []
+    for statement in statements:
+        try:
+            _execute_all(raw_connection, [statement])
+        except Exception as e:
+            raw_connection.rollback()
+            log_message(f"[Deferred] Failed: {statement}: {e}")
+            failures.append((statement, e))
+    return failures
+
+
+class RebuildError(Exception):
+    """Some dropped indexes or constraints couldn't be restored; `failures` lists (statement, error)."""
+
+    def __init__(self, table, failures):
+        self.failures = failures
+        statements = "; ".join(statement for statement, _ in failures)
+        super().__init__(f"{len(failures)} deferred objects on {table} were not restored: {statements}")
+
+
+@contextmanager
+def deferred_maintenance(engine, table, keep_columns=()):
+    """
+    Drop `table`'s secondary indexes and foreign keys for the duration of a bulk load.
+
+    On exit (also when the load fails) indexes and unique constraints are rebuilt,
+    foreign keys are re-added NOT VALID and then validated, each in a single pass over
+    the table. Per-phase timings are logged. Indexes on exactly `keep_columns` are
+    kept, e.g. the one an ON CONFLICT clause needs. The primary key always stays.
+
+    Each rebuild commits on its own, so one that fails (say, a duplicate under a
+    restored unique constraint) doesn't undo the others. Failed statements are raised
+    together as a RebuildError once everything else has been restored, chained to the
+    load's own exception if it failed too.
+    """
+    name = quote_identifier(table)
+    keep = set(keep_columns)
+    timings = {}
+    raw_connection = engine.raw_connection()
+    try:
+        started = time.perf_counter()
+        with raw_connection.cursor() as cursor:
+            cursor.execute(SECONDARY_INDEXES, {"table": name})
+            indexes = [row for row in cursor.fetchall() if not keep or set(row[4]) != keep]
+            cursor.execute(FOREIGN_KEYS, {"table": name})
+            # Definitions of FKs that are already NOT VALID say so; it's added back below
+            foreign_keys = [(fk_name, definition.removesuffix(" NOT VALID"))
+                            for fk_name, definition in cursor.fetchall()]
+
+        drops = [f"ALTER TABLE {name} DROP CONSTRAINT {quote_identifier(fk_name)}" for fk_name, _ in foreign_keys]
+        for index_name, _, constraint_name, _, _ in indexes:
+            if constraint_name:
+                drops.append(f"ALTER TABLE {name} DROP CONSTRAINT {quote_identifier(constraint_name)}")
+            else:
+                drops.append(f"DROP INDEX {quote_identifier(index_name)}")
+        # Logged first so a failed rebuild can be finished by hand
+        for index_name, index_definition, constraint_name, constraint_definition, _ in indexes:
+            log_message(f"[Deferred] {table}: {constraint_definition or index_definition}")
+        for fk_name, fk_definition in foreign_keys:
+            log_message(f"[Deferred] {table}: {fk_name} {fk_definition}")
+        _execute_all(raw_connection, drops)
+        timings["drop"] = time.perf_counter() - started
+        log_message(f"[Deferred] Dropped {len(indexes)} indexes and {len(foreign_keys)} foreign keys on {table}")
+    except Exception:
+        raw_connection.rollback()
+        raw_connection.close()
+        raise
+
+    load_error = None
+    started = time.perf_counter()
+    try:
+        yield
+    except BaseException as e:
+        load_error = e
+        raise
+    finally:
+        timings["load"] = time.perf_counter() - started
+        try:
+            started = time.perf_counter()
+            rebuilds = []
+            for _, index_definition, constraint_name, constraint_definition, _ in indexes:
+                if constraint_name:
+                    rebuilds.append(f"ALTER TABLE {name} ADD CONSTRAINT {quote_identifier(constraint_name)} "
+                                    f"{constraint_definition}")
+                else:
+                    rebuilds.append(index_definition)
+            added = []
+            for fk_name, fk_definition in foreign_keys:
+                statement = f"ALTER TABLE {name} ADD CONSTRAINT {quote_identifier(fk_name)} {fk_definition} NOT VALID"
+                rebuilds.append(statement)
+                added.append((fk_name, statement))
+            failures = _execute_each(raw_connection, rebuilds)
+            timings["rebuild indexes"] = time.perf_counter() - started
+
+            # Only foreign keys that were re-added can be validated
+            failed = {statement for statement, _ in failures}
+            started = time.perf_counter()
+            failures += _execute_each(raw_connection, [
+                f"ALTER TABLE {name} VALIDATE CONSTRAINT {quote_identifier(fk_name)}"
+                for fk_name, statement in added if statement not in failed
+            ])
+            timings["validate"] = time.perf_counter() - started
+
+            phases = ", ".join(f"{phase} {seconds:.1f}s" for phase, seconds in timings.items())
+            log_message(f"[Deferred] {table}: {phases}")
+        finally:
+            raw_connection.close()
+        if failures:
+            # Raised from finally, this replaces the load's exception, which is kept as the cause
+            raise RebuildError(table, failures) from load_error
@@ -1,17 +1,109 @@
 import json
-from sqlalchemy import create_engine, Column, String, Integer, DateTime
+import os
+import threading
+from functools import lru_cache
+from sqlalchemy import create_engine, event, Column, String, Integer, DateTime
+from sqlalchemy.engine import URL
 from sqlalchemy.orm import declarative_base
 
 
 Base = declarative_base()
 
+# Resolved from this file rather than the working directory; TEOALIDA_DB_CONFIG points elsewhere
+CONFIG_PATH = os.environ.get(
+    "TEOALIDA_DB_CONFIG",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "config", "config.json"),
+)
 
-def get_db_connection():
-    """Connect to the database using the configuration file."""
-    with open("../config/config.json", "r") as file:
+# config.json key -> environment variable that overrides it
+CONFIG_ENV = {
+    "user": "TEOALIDA_DB_USER",
+    "password": "TEOALIDA_DB_PASSWORD",
+    "host": "TEOALIDA_DB_HOST",
+    "port": "TEOALIDA_DB_PORT",
+    "dbname": "TEOALIDA_DB_NAME",
+}
+
+# create_engine pool option -> (environment variable, default)
+POOL_SETTINGS = {
+    "pool_size": ("TEOALIDA_DB_POOL_SIZE", 5),
+    "max_overflow": ("TEOALIDA_DB_MAX_OVERFLOW", 10),
+    "pool_timeout": ("TEOALIDA_DB_POOL_TIMEOUT", 30),
+    "pool_recycle": ("TEOALIDA_DB_POOL_RECYCLE", 1800),
+}
+
+# Session settings for bulk-load connections: a lost commit after a server crash is
+# acceptable for a reloadable migration, and sorts/hashes stay in memory
+BULK_SETTINGS = {
+    "synchronous_commit": os.environ.get("TEOALIDA_BULK_SYNCHRONOUS_COMMIT", "off"),
+    "work_mem": os.environ.get("TEOALIDA_BULK_WORK_MEM", "256MB"),
+    "maintenance_work_mem": os.environ.get("TEOALIDA_BULK_MAINTENANCE_WORK_MEM", "1GB"),
+}
+
+_engines = {}
+_engines_lock = threading.Lock()
+
+
+@lru_cache(maxsize=None)
+def load_config(path=CONFIG_PATH):
+    """Read the database configuration once per process, with environment overrides applied."""
+    with open(path, "r") as file:
         config = json.load(file)
-    
-        db_url = f"postgresql://{config['user']}:{config['password']}@{config['host']}:{config['port']}/{config['dbname']}"
-        
-    return create_engine(db_url)
+    for key, variable in CONFIG_ENV.items():
+        if variable in os.environ:
+            config[key] = os.environ[variable]
+    return config
+
+
+def database_url(config):
+    # psycopg2 named explicitly: the COPY loaders use its copy_expert, and newer SQLAlchemy
+    # releases default plain "postgresql" to psycopg 3
+    return URL.create(
+        "postgresql+psycopg2",
+        username=config["user"],
+        password=config["password"],
+        host=config["host"],
+        port=int(config["port"]),
+        database=config["dbname"],
+    )
+
+
+def _apply_bulk_settings(dbapi_connection, connection_record):
+    with dbapi_connection.cursor() as cursor:
+        for name, value in BULK_SETTINGS.items():
+            cursor.execute(f"SET {name} = %s", (value,))
+
+
+def _create_engine(mode, overrides):
+    options = {name: int(os.environ.get(variable, default)) for name, (variable, default) in POOL_SETTINGS.items()}
+    options.update(overrides)
+    # Liveness is checked when a connection leaves the pool, not before every statement
+    engine = create_engine(database_url(load_config()), pool_pre_ping=True, **options)
+    if mode == "bulk":
+        event.listen(engine, "connect", _apply_bulk_settings)
+    return engine
+
+
+def get_db_connection(mode="default", **pool_options):
+    """
+    Return the process-wide engine for `mode`, creating it on first use.
+
+    mode="bulk" gives connections with synchronous_commit off and a larger work_mem
+    for loads that can simply be rerun. `pool_options` override the pool settings
+    (e.g. pool_size for a parallel load); each distinct set gets its own engine.
+    """
+    if mode not in ("default", "bulk"):
+        raise ValueError(f"Unknown connection mode {mode!r}")
+    key = (mode, tuple(sorted(pool_options.items())))
+    with _engines_lock:
+        if key not in _engines:
+            _engines[key] = _create_engine(mode, pool_options)
+        return _engines[key]
+
 
+def dispose_engines():
+    """Close every pooled connection: when a run shuts down, or in a child process after fork."""
+    with _engines_lock:
+        for engine in _engines.values():
+            engine.dispose()
+        _engines.clear()
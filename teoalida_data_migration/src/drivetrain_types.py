@@ -2,19 +2,21 @@ import pandas as pd
 from datetime import datetime
 from sqlalchemy.orm import sessionmaker
 from utils import log_message
-from db_connection import get_db_connection
+from db_connection import dispose_engines, get_db_connection
+from workbook import read_workbook, column_mapping
+
+# Sheet columns this migration reads: {sheet column: (table column, dtype)}
+COLUMNS = {
+    "Drive type": ("type", "category"),
+    "Car classification": ("use_case", "category"),
+}
+
 
 def transform_drivetrain_types_data(data):
     """Transform data to match DrivetrainTypes table schema."""
     log_message("Transforming Drivetrain Type data...")
 
-    column_mapping = {
-        "Drive type": "type",
-        "Car classification": "use_case"
-    }
-
-    # Rename columns based on mapping
-    data.rename(columns=column_mapping, inplace=True)
+    data.rename(columns=column_mapping(COLUMNS), inplace=True)
 
     required_columns = ["type", "description", "use_case"]
 
@@ -43,15 +45,11 @@ def migrate_drivetrain_types(file_path):
     """Load Excel data and migrate to PostgreSQL DrivetrainTypes table."""
     try:
         log_message("📂 Loading data from Excel...")
-        data = pd.read_excel(file_path)
+        data = read_workbook(file_path, COLUMNS, unique_rows=True)
 
         # Print raw data for debugging
         print("\n📊 Raw Data from Excel:\n", data.head())
 
-        # Remove duplicate rows
-        log_message("🔍 Removing duplicate rows...")
-        data = data.drop_duplicates()
-
         # Transform data to match database schema
         transformed_data = transform_drivetrain_types_data(data)
 
@@ -112,4 +110,7 @@ def migrate_drivetrain_types(file_path):
         session.close()
 
 if __name__ == "__main__":
-    migrate_drivetrain_types("../data/teoalida_data.xlsx")
+    try:
+        migrate_drivetrain_types("../data/teoalida_data.xlsx")
+    finally:
+        dispose_engines()
@@ -0,0 +1,252 @@
+import asyncio
+import queue
+import random
+import statistics
+import threading
+import time
+import aiohttp
+from ecu_http import HEADERS, BLOCKED_MARKERS, SEARCH_URL, search_page_url
+from ecu_extract import parse_search_page, extract_tracking_products, products_to_parts
+from response_cache import get_response_cache
+from scrape_pool import target_host
+from utils import log_message
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+_DONE = object()
+
+
+class TokenBucket:
+    """Allows `rate` requests per second on average with bursts of up to `burst`."""
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.capacity = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class AsyncSearchClient:
+    """
+    asyncio client for the ECU parts search with per-host rate limits.
+
+    Connections are pooled per host by one aiohttp connector, each <make> host gets its
+    own token bucket, and 429/5xx responses are retried with jittered exponential
+    backoff. Every request's timing is kept in `timings`.
+
+    `search_url` is formatted with `host` (e.g. "toyota.oempartsonline.com"), so tests
+    can point it at a local stub server such as "http://127.0.0.1:8080/{host}/search".
+    """
+
+    def __init__(self, search_url=SEARCH_URL, max_in_flight=200, limit_per_host=8, per_host_rate=2.0,
+                 per_host_burst=4, max_retries=4, backoff_base=1.0, backoff_cap=60.0, timeout=20):
+        self.search_url = search_url
+        self.max_in_flight = max_in_flight
+        self.limit_per_host = limit_per_host
+        self.per_host_rate = per_host_rate
+        self.per_host_burst = per_host_burst
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.timeout = timeout
+        self.timings = []
+        self._buckets = {}
+        self._session = None
+
+    async def __aenter__(self):
+        connector = aiohttp.TCPConnector(limit=self.max_in_flight, limit_per_host=self.limit_per_host,
+                                         ttl_dns_cache=300)
+        self._session = aiohttp.ClientSession(connector=connector, headers=HEADERS,
+                                              timeout=aiohttp.ClientTimeout(total=self.timeout))
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self._session.close()
+
+    def _bucket(self, host):
+        if host not in self._buckets:
+            self._buckets[host] = TokenBucket(self.per_host_rate, self.per_host_burst)
+        return self._buckets[host]
+
+    def _backoff(self, attempt, retry_after=None):
+        if retry_after is not None:
+            try:
+                return min(self.backoff_cap, float(retry_after))
+            except ValueError:
+                pass
+        delay = min(self.backoff_cap, self.backoff_base * 2 ** attempt)
+        return random.uniform(delay / 2, delay)
+
+    async def fetch_html(self, target):
+        """Return the search page HTML for a target, or None if it's blocked or keeps failing."""
+        host = target_host(target)
+        url = search_page_url(target.make, target.model, target.year, self.search_url)
+
+        for attempt in range(self.max_retries + 1):
+            await self._bucket(host).acquire()
+            started = time.perf_counter()
+            status, html, retry_after, error = None, None, None, None
+            try:
+                async with self._session.get(url) as response:
+                    status = response.status
+                    retry_after = response.headers.get("Retry-After")
+                    html = await response.text()
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                error = e
+
+            self.timings.append({
+                "host": host,
+                "target": (target.make, target.model, target.year),
+                "attempt": attempt + 1,
+                "status": status,
+                "seconds": time.perf_counter() - started,
+                "bytes": len(html) if html else 0,
+                "error": repr(error) if error else None,
+            })
+
+            if status == 200:
+                if any(marker in html[:5000].lower() for marker in BLOCKED_MARKERS):
+                    log_message(f"[Async] Blocked page for {url}")
+                    return None
+                return html
+            if status is not None and status not in RETRY_STATUSES:
+                log_message(f"[Async] Status {status} for {target.make} {target.model} {target.year}")
+                return None
+            if attempt < self.max_retries:
+                await asyncio.sleep(self._backoff(attempt, retry_after))
+
+        log_message(f"[Async] Giving up on {target.make} {target.model} {target.year} after {self.max_retries + 1} attempts")
+        return None
+
+    async def fetch_parts(self, target):
+        """
+        Return the parts for a target, or None if the page couldn't be fetched or parsed.
+
+        A page in the response cache is used as is; fetched pages are cached only when
+        they had products. Any error is logged and reported as None, so one bad page
+        can't end the scrape of the targets still in flight.
+        """
+        try:
+            return await self._fetch_parts(target)
+        except Exception as e:
+            log_message(f"[Async] Failed on {target.make} {target.model} {target.year}: {e!r}")
+            return None
+
+    async def _fetch_parts(self, target):
+        cache = get_response_cache()
+        url = search_page_url(target.make, target.model, target.year, self.search_url)
+        cached = await asyncio.to_thread(cache.get, url)
+        if cached is not None:
+            return parse_search_page(cached)
+
+        html = await self.fetch_html(target)
+        if html is None:
+            return None
+        products = extract_tracking_products(html)
+        parts = products_to_parts(products) if products else []
+        if not parts:
+            return None
+        await asyncio.to_thread(cache.put, url, html)
+        return parts
+
+    def log_timing_summary(self):
+        if not self.timings:
+            return
+        seconds = sorted(t["seconds"] for t in self.timings)
+        retried = sum(1 for t in self.timings if t["attempt"] > 1)
+        log_message(
+            f"[Async] {len(seconds)} requests ({retried} retries): median {statistics.median(seconds):.2f}s, "
+            f"p95 {seconds[min(len(seconds) - 1, int(len(seconds) * 0.95))]:.2f}s, max {seconds[-1]:.2f}s"
+        )
+
+
+async def scrape_targets(targets, client, max_pending=None):
+    """
+    Fetch targets concurrently and yield (target, parts or None) as each finishes.
+
+    With `max_pending`, at most that many fetches are under way and the next target is
+    started only once a result has been taken, so a consumer that stops to await
+    something else also pauses the scrape. Without it every target starts at once.
+    """
+    remaining = iter(targets)
+    pending = set()
+
+    def refill():
+        while max_pending is None or len(pending) < max_pending:
+            target = next(remaining, None)
+            if target is None:
+                return
+            pending.add(asyncio.ensure_future(_with_target(target, client)))
+
+    refill()
+    try:
+        while pending:
+            done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                pending.discard(task)
+                yield task.result()
+                refill()
+    finally:
+        for task in pending:
+            task.cancel()
+
+
+async def _with_target(target, client):
+    return target, await client.fetch_parts(target)
+
+
+def iter_async_results(targets, max_pending=100, **client_options):
+    """
+    Run the async scraper on a background event loop and yield (target, parts or None)
+    in this thread as results arrive, so a synchronous writer can consume them. At
+    most `max_pending` fetches are under way and as many results wait in the hand-off
+    queue, so a slow consumer holds the scrape back instead of letting results pile up.
+    """
+    results = queue.Queue(maxsize=max_pending)
+    stop = threading.Event()
+
+    async def produce():
+        async with AsyncSearchClient(**client_options) as client:
+            async for item in scrape_targets(targets, client, max_pending):
+                if stop.is_set():
+                    break
+                await asyncio.to_thread(results.put, item)
+            client.log_timing_summary()
+
+    def run():
+        try:
+            asyncio.run(produce())
+        except Exception as e:
+            log_message(f"[Async] Scraper failed: {e}")
+        finally:
+            results.put(_DONE)
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    try:
+        while True:
+            item = results.get()
+            if item is _DONE:
+                break
+            yield item
+    finally:
+        stop.set()
+        # Unblock the loop if it's waiting to hand over a result
+        while thread.is_alive():
+            try:
+                results.get(timeout=0.1)
+            except queue.Empty:
+                pass
+        thread.join()
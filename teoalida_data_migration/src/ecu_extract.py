@@ -0,0 +1,195 @@
+import json
+import re
+from bs4 import BeautifulSoup
+from utils import log_message
+
+try:
+    import lxml.html
+    from lxml import etree
+except ImportError:
+    lxml = None
+
+try:
+    # The lexbor backend; selectolax 1.0 removed the older selectolax.parser one
+    from selectolax.lexbor import LexborHTMLParser
+except ImportError:
+    LexborHTMLParser = None
+
+PRODUCT_SELECTOR = ".product-details-col"
+TITLE_SELECTOR = ".product-title a h2"
+PART_NUMBER_SELECTOR = ".catalog-product-id a"
+
+# The search page embeds `var tracking = {... "products": [...] ...}; var digitalData`
+TRACKING_PATTERN = re.compile(r"var tracking\s*=\s*({.*?});\s*var digitalData", re.DOTALL)
+PRODUCTS_PATTERN = re.compile(r'"products"\s*:\s*(\[\s*{.*?}\s*])', re.DOTALL)
+
+# Candidate keys in a tracking product for the part's name and number. "id" and
+# "product_id" are the shop's own product ids, not part numbers, so they don't count;
+# a product without a part number is skipped.
+NAME_KEYS = ("name", "product_name", "title")
+PART_NUMBER_KEYS = ("sku", "part_number", "partNumber")
+
+
+def extract_tracking_products(html):
+    """Return the products array from the page's tracking object, or None if it isn't there."""
+    tracking_match = TRACKING_PATTERN.search(html)
+    if not tracking_match:
+        return None
+    products_match = PRODUCTS_PATTERN.search(tracking_match.group(1))
+    if not products_match:
+        return []
+    try:
+        return json.loads(products_match.group(1))
+    except json.JSONDecodeError as e:
+        log_message(f"[Warning] Could not decode tracking products: {e}")
+        return None
+
+
+def _first_value(product, keys):
+    for key in keys:
+        value = product.get(key)
+        if value not in (None, ""):
+            return str(value).strip()
+    return None
+
+
+def products_to_parts(products):
+    """Convert tracking products to the {"name", "part_number"} dicts scrape_ecu_data returns."""
+    parts = []
+    for product in products:
+        if not isinstance(product, dict):
+            continue
+        part = {
+            "name": _first_value(product, NAME_KEYS),
+            "part_number": _first_value(product, PART_NUMBER_KEYS),
+        }
+        if part["name"] and part["part_number"]:
+            parts.append(part)
+    return parts
+
+
+def _css_to_xpath(selector):
+    """Translate the descendant class/tag selectors used here (".a b .c") into XPath."""
+    steps = []
+    for token in selector.split():
+        if token.startswith("."):
+            steps.append(f"descendant::*[contains(concat(' ', normalize-space(@class), ' '), ' {token[1:]} ')]")
+        else:
+            steps.append(f"descendant::{token}")
+    return "/".join(steps)
+
+
+def _bs4_blocks(html):
+    return BeautifulSoup(html, "html.parser").select(PRODUCT_SELECTOR)
+
+
+def _bs4_fields(block):
+    title_el = block.select_one(TITLE_SELECTOR)
+    part_number_el = block.select_one(PART_NUMBER_SELECTOR)
+    return (title_el.text if title_el else None,
+            part_number_el.text if part_number_el else None)
+
+
+if lxml is not None:
+    # Compiled once; evaluating a compiled XPath skips re-parsing the expression per block
+    _LXML_PARSER = lxml.html.HTMLParser(encoding="utf-8")
+    _LXML_PRODUCTS = etree.XPath(_css_to_xpath(PRODUCT_SELECTOR))
+    _LXML_TITLE = etree.XPath(f"({_css_to_xpath(TITLE_SELECTOR)})[1]")
+    _LXML_PART_NUMBER = etree.XPath(f"({_css_to_xpath(PART_NUMBER_SELECTOR)})[1]")
+
+
+def _lxml_blocks(html):
+    if not html.strip():
+        return []
+    # Parsing bytes sidesteps lxml's refusal of str input that carries an encoding declaration
+    # document_fromstring: for a bare fragment fromstring returns the block itself, which a
+    # descendant:: search from it would miss
+    return _LXML_PRODUCTS(lxml.html.document_fromstring(html.encode("utf-8"), parser=_LXML_PARSER))
+
+
+def _lxml_fields(block):
+    title_el = _LXML_TITLE(block)
+    part_number_el = _LXML_PART_NUMBER(block)
+    return (title_el[0].text_content() if title_el else None,
+            part_number_el[0].text_content() if part_number_el else None)
+
+
+def _selectolax_blocks(html):
+    return LexborHTMLParser(html).css(PRODUCT_SELECTOR)
+
+
+def _selectolax_fields(block):
+    title_el = block.css_first(TITLE_SELECTOR)
+    part_number_el = block.css_first(PART_NUMBER_SELECTOR)
+    return (title_el.text() if title_el else None,
+            part_number_el.text() if part_number_el else None)
+
+
+# Every backend, fastest first
+EXTRACTOR_NAMES = ("selectolax", "lxml", "bs4")
+
+# name -> (find the product blocks in a page, read (title, part number) from a block),
+# for the backends whose parser is installed; the others are in UNAVAILABLE_EXTRACTORS
+EXTRACTORS = {}
+UNAVAILABLE_EXTRACTORS = {}
+if LexborHTMLParser is not None:
+    EXTRACTORS["selectolax"] = (_selectolax_blocks, _selectolax_fields)
+else:
+    UNAVAILABLE_EXTRACTORS["selectolax"] = "needs selectolax>=0.3 (selectolax.lexbor)"
+if lxml is not None:
+    EXTRACTORS["lxml"] = (_lxml_blocks, _lxml_fields)
+else:
+    UNAVAILABLE_EXTRACTORS["lxml"] = "needs lxml"
+EXTRACTORS["bs4"] = (_bs4_blocks, _bs4_fields)
+
+_extractor = next(iter(EXTRACTORS))
+
+
+def _available_extractor(name):
+    """`name` if it's installed, else the fastest backend that is, with a warning saying so."""
+    if name == "auto":
+        name = EXTRACTOR_NAMES[0]
+    if name in EXTRACTORS:
+        return name
+    if name not in UNAVAILABLE_EXTRACTORS:
+        raise ValueError(f"Unknown extractor {name!r}; known: {', '.join(EXTRACTOR_NAMES)}")
+    fallback = next(iter(EXTRACTORS))
+    log_message(f"[Warning] Extractor {name!r} is unavailable ({UNAVAILABLE_EXTRACTORS[name]}); using {fallback!r}")
+    return fallback
+
+
+def configure_extractor(name):
+    """Select the HTML backend parse_product_blocks uses by default ("auto" picks the fastest installed)."""
+    global _extractor
+    _extractor = _available_extractor(name)
+    return _extractor
+
+
+def parse_product_blocks(html, extractor=None):
+    """Return the parts listed in the page's rendered .product-details-col blocks."""
+    find_blocks, block_fields = EXTRACTORS[_available_extractor(extractor) if extractor else _extractor]
+
+    results = []
+    for block in find_blocks(html):
+        try:
+            name, part_number = block_fields(block)
+
+            part = {
+                "name": name.strip() if name else None,
+                "part_number": part_number.strip() if part_number else None,
+            }
+
+            if part["name"] and part["part_number"]:
+                results.append(part)
+            else:
+                log_message("[Warning] Incomplete part skipped.")
+        except Exception as e:
+            log_message(f"[Warning] Block error: {e}")
+    return results
+
+
+def parse_search_page(html, extractor=None):
+    """Parts from a search page: the tracking JSON when it has any, else the rendered blocks."""
+    products = extract_tracking_products(html)
+    parts = products_to_parts(products) if products else []
+    return parts or parse_product_blocks(html, extractor)
@@ -0,0 +1,82 @@
+import threading
+from urllib.parse import urlencode
+import requests
+from requests.adapters import HTTPAdapter
+from ecu_extract import extract_tracking_products, products_to_parts
+from response_cache import get_response_cache
+from utils import log_message
+
+SEARCH_URL = "https://{host}/search"
+HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) "
+                  "Chrome/137.0 Safari/537.36",
+    "Accept": "text/html,application/xhtml+xml",
+    "Accept-Language": "en-US,en;q=0.9",
+}
+
+BLOCKED_STATUSES = {403, 429, 503}
+BLOCKED_MARKERS = ("captcha", "cf-challenge", "access denied")
+
+_local = threading.local()
+
+
+def get_http_session(pool_size=10):
+    """Return this thread's keep-alive session (requests.Session isn't safe to share across threads)."""
+    session = getattr(_local, "session", None)
+    if session is None:
+        session = requests.Session()
+        session.headers.update(HEADERS)
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        _local.session = session
+    return session
+
+
+def search_params(make, model, year):
+    return {"search_str": "ECU", "make": make, "model": model, "year": year}
+
+
+def search_page_url(make, model, year, search_url=SEARCH_URL):
+    """Full search URL for a target; also the key its page is cached under."""
+    host = f"{make.lower()}.oempartsonline.com"
+    return f"{search_url.format(host=host)}?{urlencode(search_params(make, model, year))}"
+
+
+def is_blocked(response):
+    if response.status_code in BLOCKED_STATUSES:
+        return True
+    head = response.text[:5000].lower()
+    return any(marker in head for marker in BLOCKED_MARKERS)
+
+
+def fetch_ecu_parts(make, model, year, timeout=15):
+    """
+    Fetch the ECU search page over plain HTTP and parse its tracking JSON.
+
+    Returns the parts found, or None when the request was blocked, failed, or the page
+    had no usable products, in which case the caller should use the browser instead.
+    Only pages with products are cached, so a cached page is always a usable answer.
+    """
+    url = search_page_url(make, model, year)
+    try:
+        response = get_http_session().get(url, timeout=timeout)
+    except requests.RequestException as e:
+        log_message(f"[HTTP] Request failed for {make} {model} {year}: {e}")
+        return None
+
+    if is_blocked(response):
+        log_message(f"[HTTP] Blocked ({response.status_code}) for {make} {model} {year}")
+        return None
+    if response.status_code != 200:
+        log_message(f"[HTTP] Unexpected status {response.status_code} for {make} {model} {year}")
+        return None
+
+    products = extract_tracking_products(response.text)
+    parts = products_to_parts(products) if products else []
+    if not parts:
+        return None
+
+    get_response_cache().put(url, response.text)
+    log_message(f"[HTTP] Found {len(parts)} ECU parts for {make} {model} {year}")
+    return parts
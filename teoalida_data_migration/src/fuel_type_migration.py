@@ -2,20 +2,22 @@ import pandas as pd
 from datetime import datetime
 from sqlalchemy.orm import sessionmaker
 from utils import log_message
-from db_connection import get_db_connection
+from db_connection import dispose_engines, get_db_connection
+from workbook import read_workbook, column_mapping
+
+# Sheet columns this migration reads: {sheet column: (table column, dtype)}
+COLUMNS = {
+    "Fuel type": ("fuel_type", "category"),
+    "Trim (description)": ("description", object),
+}
+
 
 # Data Transformation Function for FuelTypes
 def transform_fuel_types_data(data):
     """Transform data to match FuelTypes table schema."""
     log_message("Transforming Fuel Type data...")
 
-    column_mapping = {
-        "Fuel type": "fuel_type",  # Assuming column name in Excel
-        "Trim (description)": "description",
-    }
-
-    # Rename columns based on mapping
-    data.rename(columns=column_mapping, inplace=True)
+    data.rename(columns=column_mapping(COLUMNS), inplace=True)
 
     required_columns = ["fuel_type", "description"]
 
@@ -44,11 +46,7 @@ def migrate_fuel_types(file_path):
     """Load Excel data and migrate to PostgreSQL FuelTypes table using the FuelType model."""
     try:
         log_message("Loading data from Excel...")
-        data = pd.read_excel(file_path)
-
-        # Remove duplicate rows
-        log_message("Removing duplicate rows...")
-        data = data.drop_duplicates()
+        data = read_workbook(file_path, COLUMNS, unique_rows=True)
 
         # Transform data to match database schema
         transformed_data = transform_fuel_types_data(data)
@@ -97,4 +95,7 @@ def migrate_fuel_types(file_path):
         session.close()
 
 if __name__ == "__main__":
-    migrate_fuel_types("../data/teoalida_data.xlsx")
+    try:
+        migrate_fuel_types("../data/teoalida_data.xlsx")
+    finally:
+        dispose_engines()
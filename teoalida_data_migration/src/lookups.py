@@ -0,0 +1,80 @@
+import threading
+import pandas as pd
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert
+from models.manufacturer import Manufacturer
+
+# Process-wide make -> manufacturer id map, shared by every stage that needs it
+_manufacturer_ids = {}
+_manufacturer_ids_lock = threading.Lock()
+
+
+def lookup_keys(series):
+    """
+    The values of `series` as lookup keys: text, with missing values left as NaN.
+
+    Workbook columns can mix numbers and strings ("Model" holds both 3 and "Civic"),
+    while the lookup columns are varchar; keys and the values mapped onto them must
+    go through the same conversion to match.
+    """
+    return series.astype(object).map({value: str(value) for value in series.dropna().unique()})
+
+
+def upsert_lookup(session, model_class, field_name, values, id_field="id"):
+    """
+    Return {value: id} for `values`, inserting the ones the table doesn't have yet.
+
+    Only the candidate values travel to the database: one SELECT ... IN for the
+    existing rows, then one INSERT ... ON CONFLICT DO NOTHING ... RETURNING for the
+    new ones. No ORM objects are loaded, so the cost follows the number of values
+    rather than the size of the table. Values are compared as text (see lookup_keys).
+    """
+    values = {str(v) for v in values if not pd.isna(v) and str(v)}
+    if not values:
+        return {}
+
+    field = getattr(model_class, field_name)
+    id_column = getattr(model_class, id_field)
+
+    mapping = dict(session.execute(select(field, id_column).where(field.in_(values))).all())
+
+    missing = values - mapping.keys()
+    if missing:
+        statement = (
+            insert(model_class)
+            .values([{field_name: v} for v in missing])
+            .on_conflict_do_nothing()
+            .returning(field, id_column)
+        )
+        mapping.update(session.execute(statement).all())
+        session.commit()
+
+        # With a unique constraint on the field, ON CONFLICT skips values another loader
+        # inserted since our SELECT; RETURNING leaves those out, so select them again.
+        # Tables without one (models, engine_types) can end up with duplicate names.
+        missing = values - mapping.keys()
+        if missing:
+            mapping.update(session.execute(select(field, id_column).where(field.in_(missing))).all())
+
+    return mapping
+
+
+def get_manufacturer_ids(session, short_names):
+    """
+    Return {short_name: manufacturer id} for the given makes.
+
+    Makes already resolved by any stage in this process are served from memory; the
+    rest are fetched with a single query. Makes with no manufacturer row are left out
+    of the result and are looked up again next time.
+    """
+    names = {name for name in short_names if isinstance(name, str) and name}
+
+    with _manufacturer_ids_lock:
+        missing = names - _manufacturer_ids.keys()
+        if missing:
+            rows = session.execute(
+                select(Manufacturer.short_name, Manufacturer.id).where(Manufacturer.short_name.in_(missing))
+            ).all()
+            for short_name, manufacturer_id in rows:
+                _manufacturer_ids.setdefault(short_name, manufacturer_id)
+        return {name: _manufacturer_ids[name] for name in names if name in _manufacturer_ids}
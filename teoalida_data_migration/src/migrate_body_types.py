@@ -2,24 +2,26 @@ import pandas as pd
 from datetime import datetime
 from sqlalchemy.orm import sessionmaker
 from utils import log_message
-from db_connection import get_db_connection
+from db_connection import dispose_engines, get_db_connection
+from workbook import read_workbook, column_mapping
+
+# Sheet columns this migration reads: {sheet column: (table column, dtype)}
+COLUMNS = {
+    "Body type": ("type", "category"),
+    "Trim (description)": ("description", object),
+    "Doors": ("doors", None),
+    "Total seating": ("seating_capacity_range", None),
+    "Cargo capacity (cu ft)": ("cargo_capacity", None),  # we need in form of - small, medium, large but data has capacity in cubic
+    "Car classification": ("common_use_cases", "category"),
+}
+
 
 # Data Transformation Function for BodyTypes
 def transform_body_types_data(data):
     """Transform data to match BodyTypes table schema."""
     log_message("Transforming Body Type data...")
 
-    column_mapping = {
-        "Body type": "type",  # Assuming column name in Excel
-        "Trim (description)": "description",
-        "Doors": "doors",
-        "Total seating": "seating_capacity_range",
-        "Cargo capacity (cu ft)": "cargo_capacity",  # we need in form of - small, medium, large but data has capacity in cubic
-        "Car classification": "common_use_cases",
-    }
-
-    # Rename columns based on mapping
-    data.rename(columns=column_mapping, inplace=True)
+    data.rename(columns=column_mapping(COLUMNS), inplace=True)
 
     required_columns = ["type", "description", "doors", "seating_capacity_range", "cargo_capacity", "common_use_cases"]
 
@@ -54,11 +56,7 @@ def migrate_body_types(file_path):
     """Load Excel data and migrate to PostgreSQL BodyTypes table using the BodyType model."""
     try:
         log_message("Loading data from Excel...")
-        data = pd.read_excel(file_path)
-
-        # Remove duplicate rows
-        log_message("Removing duplicate rows...")
-        data = data.drop_duplicates()
+        data = read_workbook(file_path, COLUMNS, unique_rows=True)
 
         # Transform data to match database schema
         transformed_data = transform_body_types_data(data)
@@ -106,4 +104,7 @@ def migrate_body_types(file_path):
         session.close()
 
 if __name__ == "__main__":
-    migrate_body_types("../data/teoalida_data.xlsx")
+    try:
+        migrate_body_types("../data/teoalida_data.xlsx")
+    finally:
+        dispose_engines()
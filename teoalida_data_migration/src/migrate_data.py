@@ -5,10 +5,23 @@ from sqlalchemy import create_engine, Column, String, Integer, DateTime, Text
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from utils import log_message
-from db_connection import get_db_connection
+from db_connection import dispose_engines, get_db_connection
+from bulk_loader import psql_insert_copy
+from workbook import read_workbook, column_mapping
 from sqlalchemy.dialects.postgresql import UUID
 import re
 
+# Mapping Excel columns to DB columns: {sheet column: (table column, dtype)}
+COLUMNS = {
+    "ID": ("id", None),
+    "Make": ("short_name", object),
+    "Country of origin": ("country", object),
+    "Image URL": ("logo_url", object),
+    "Year": ("established_year", None),
+    "Source URL": ("website_url", object),
+    "Trim (description)": ("additional_info", object),
+}
+
 # Define the base class for SQLAlchemy models
 Base = declarative_base()
 
@@ -42,19 +55,8 @@ def transform_manufacturers_data(data):
     """Transform data to match the Manufacturers table schema."""
     log_message("Transforming Manufacturer data...")
 
-    # Mapping Excel columns to DB columns
-    column_mapping = {
-        "ID": "id",
-        "Make": "short_name",
-        "Country of origin": "country",
-        "Image URL": "logo_url",
-        "Year": "established_year",
-        "Source URL": "website_url",
-        "Trim (description)": "additional_info",
-    }
-
     # Rename columns
-    data.rename(columns=column_mapping, inplace=True)
+    data.rename(columns=column_mapping(COLUMNS), inplace=True)
 
     # Define required columns
     required_columns = [
@@ -104,19 +106,16 @@ def migrate_manufacturers(file_path):
     """Load Excel data and migrate to PostgreSQL Manufacturers table."""
     try:
         log_message("Loading data from Excel...")
-        data = pd.read_excel(file_path)
-
-        log_message("Removing duplicate rows...")
-        data = data.drop_duplicates()
+        data = read_workbook(file_path, COLUMNS, unique_rows=True)
 
         transformed_data = transform_manufacturers_data(data)
 
-        engine = get_db_connection()
+        engine = get_db_connection("bulk")
 
         Base.metadata.create_all(engine)
 
         log_message("Inserting data into PostgreSQL Manufacturers table in chunks...")
-        transformed_data.to_sql("manufacturers", con=engine, if_exists="append", index=False, chunksize=1000)
+        transformed_data.to_sql("manufacturers", con=engine, if_exists="append", index=False, method=psql_insert_copy)
 
         log_message("Data successfully migrated to PostgreSQL.")
 
@@ -126,4 +125,7 @@ def migrate_manufacturers(file_path):
 
 
 if __name__ == "__main__":
-    migrate_manufacturers("../data/teoalida_data.xlsx")
+    try:
+        migrate_manufacturers("../data/teoalida_data.xlsx")
+    finally:
+        dispose_engines()
@@ -3,22 +3,26 @@ import pandas as pd
 from sqlalchemy.orm import sessionmaker
 from models.EE_architechures import Base, EEArchitecture
 from datetime import datetime
-from db_connection import get_db_connection
+from db_connection import dispose_engines, get_db_connection
+from workbook import read_workbook, column_mapping
+from batch_writer import BatchWriter, quarantine_path
 import uuid
 
+# ✅ Dataset columns used for the EE_Architectures table: {sheet column: (table column, dtype)}
+COLUMNS = {
+    "Year": ("introduced_year", None),
+    "Platform code / generation number": ("version", object),
+    "Drive type": ("type", object),
+    "Fuel type": ("communication_protocols", object),
+    "Review": ("description", object),
+    "Pros": ("supported_feature_list", object),
+}
+
 def extract_ee_architectures_data(data):
     """Extract and transform EE architecture data from the car dataset."""
 
     # ✅ Map dataset columns to EE_Architectures table
-    column_mapping = {
-        "Year": "introduced_year",
-        "Platform code / generation number": "version",
-        "Drive type": "type",
-        "Fuel type": "communication_protocols",
-        "Review": "description",
-        "Pros": "supported_feature_list",
-    }
-    data.rename(columns=column_mapping, inplace=True)
+    data.rename(columns=column_mapping(COLUMNS), inplace=True)
 
     # ✅ Ensure required columns exist
     required_columns = [
@@ -48,7 +52,7 @@ def extract_ee_architectures_data(data):
 
     return data
 
-def migrate_ee_architectures(file_path):
+def migrate_ee_architectures(file_path, batch_size=500):
     """Load EE architecture data from Excel and insert it into PostgreSQL."""
     try:
         # ✅ Ensure file exists
@@ -58,11 +62,7 @@ def migrate_ee_architectures(file_path):
             return
 
         print(f"Loading EE architecture data from {file_path}...")
-        data = pd.read_excel(file_path)
-
-        # ✅ Remove duplicates
-        print("Removing duplicate rows...")
-        data = data.drop_duplicates()
+        data = read_workbook(file_path, COLUMNS, unique_rows=True)
 
         # ✅ Transform data
         transformed_data = extract_ee_architectures_data(data)
@@ -77,22 +77,25 @@ def migrate_ee_architectures(file_path):
 
         print("Adding EE Architecture data to PostgreSQL...")
 
-        # ✅ Insert data into EE_Architectures table
-        for _, row in transformed_data.iterrows():
-            new_entry = EEArchitecture(
-                id=uuid.uuid4(),  # Generate unique ID
-                introduced_year=row["introduced_year"],
-                version=row["version"],
-                type=row["type"],
-                communication_protocols=row["communication_protocols"],
-                description=row["description"],
-                supported_feature_list=row["supported_feature_list"],
-                created_at=row["created_at"],
-                updated_at=row["updated_at"],
-            )
-            session.add(new_entry)
-
-        session.commit()
+        # ✅ Insert data into EE_Architectures table, committing per batch; bad rows are quarantined
+        columns = [
+            "introduced_year",
+            "version",
+            "type",
+            "communication_protocols",
+            "description",
+            "supported_feature_list",
+            "created_at",
+            "updated_at",
+        ]
+        rows = transformed_data[columns].astype(object)
+        rows = rows.where(rows.notna(), None)
+        with BatchWriter(session, EEArchitecture, batch_size,
+                         quarantine_file=quarantine_path(EEArchitecture.__tablename__)) as writer:
+            for record in rows.to_dict("records"):
+                writer.add({"id": uuid.uuid4(), **record})
+
+        print(f"Inserted {writer.written} rows, quarantined {writer.quarantined}.")
         print("✅ EE Architecture data successfully added.")
 
         session.close()
@@ -102,4 +105,7 @@ def migrate_ee_architectures(file_path):
         raise
 
 if __name__ == "__main__":
-    migrate_ee_architectures("../data/teoalida_data.xlsx")
+    try:
+        migrate_ee_architectures("../data/teoalida_data.xlsx")
+    finally:
+        dispose_engines()
@@ -3,23 +3,28 @@ from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 from models.engine_types import Base, EngineType
 from datetime import datetime
-from db_connection import get_db_connection
+from db_connection import dispose_engines, get_db_connection
+from bulk_loader import psql_insert_copy
+from workbook import read_workbook, column_mapping
+
+# Sheet columns this migration reads: {sheet column: (table column, dtype)}
+COLUMNS = {
+    # The sheet's header has a trailing space
+    "Engine type ": ("name", "category"),
+    "Trim (description)": ("description", object),
+    "Horsepower (HP)": ("power_output_hp", None),
+    "Kilowatts": ("power_output_kw", None),
+    "Cylinders": ("cylinder_count", None),
+    "EPA electricity range (mi)": ("electric_motor_count", None),
+    "Battery capacity (kWh)": ("battery_capacity_kwh", None),
+}
+
 
 def transform_engine_types_data(data):
     """Transform data to match EngineTypes schema."""
 
     # Map columns from Excel to database fields
-    column_mapping = {
-        "Engine type": "name",
-        "Trim (description)": "description",
-        "Horsepower (HP)": "power_output_hp",
-        "Kilowatts": "power_output_kw",
-        "Cylinders": "cylinder_count",
-        "EPA electricity range (mi)": "electric_motor_count",
-        "Battery capacity (kWh)": "battery_capacity_kwh",
-    }
-
-    data.rename(columns=column_mapping, inplace=True)
+    data.rename(columns=column_mapping(COLUMNS), inplace=True)
 
     # Ensure all required columns exist
     required_columns = [
@@ -63,15 +68,12 @@ def migrate_engine_types(file_path):
     """Load Excel data and migrate to PostgreSQL EngineTypes table."""
     try:
         print("📥 Loading data from Excel...")
-        data = pd.read_excel(file_path)
-
-        print("🧹 Removing duplicate rows...")
-        data = data.drop_duplicates()
+        data = read_workbook(file_path, COLUMNS, unique_rows=True)
 
         print("🔄 Transforming data...")
         transformed_data = transform_engine_types_data(data)
 
-        engine = get_db_connection()
+        engine = get_db_connection("bulk")
         Session = sessionmaker(bind=engine)
         session = Session()
 
@@ -79,7 +81,7 @@ def migrate_engine_types(file_path):
         Base.metadata.create_all(engine)
 
         print("🚀 Inserting data into PostgreSQL EngineTypes table...")
-        transformed_data.to_sql("engine_types", con=engine, if_exists="append", index=False, chunksize=1000)
+        transformed_data.to_sql("engine_types", con=engine, if_exists="append", index=False, method=psql_insert_copy)
 
         print("✅ Data successfully migrated to PostgreSQL.")
         session.close()
@@ -89,4 +91,7 @@ def migrate_engine_types(file_path):
         raise
 
 if __name__ == "__main__":
-    migrate_engine_types("../data/teoalida_data.xlsx")
+    try:
+        migrate_engine_types("../data/teoalida_data.xlsx")
+    finally:
+        dispose_engines()
@@ -2,18 +2,20 @@ import pandas as pd
 from datetime import datetime
 from sqlalchemy.orm import sessionmaker
 from utils import log_message
-from db_connection import get_db_connection
+from db_connection import dispose_engines, get_db_connection
+from workbook import read_workbook, column_mapping
+
+# Sheet columns this migration reads: {sheet column: (table column, dtype)}
+COLUMNS = {
+    "Transmission": ("description", "category"),
+}
+
 
 def transform_trans_types_data(data):
     """Transform data to match TransTypes table schema and extract the last word from trans_type."""
     log_message("Transforming Transmission Type data...")
 
-    column_mapping = {
-        "Transmission": "description",
-    }
-
-    # Rename columns based on mapping
-    data.rename(columns=column_mapping, inplace=True)
+    data.rename(columns=column_mapping(COLUMNS), inplace=True)
 
     required_columns = ["trans_type", "description", "gear_count"]
 
@@ -52,11 +54,7 @@ def migrate_trans_types(file_path):
     """Load Excel data and migrate to PostgreSQL TransTypes table."""
     try:
         log_message("Loading data from Excel...")
-        data = pd.read_excel(file_path)
-
-        # Remove duplicate rows
-        log_message("Removing duplicate rows...")
-        data = data.drop_duplicates()
+        data = read_workbook(file_path, COLUMNS, unique_rows=True)
 
         # Transform data to match database schema
         transformed_data = transform_trans_types_data(data)
@@ -101,4 +99,7 @@ def migrate_trans_types(file_path):
         session.close()
 
 if __name__ == "__main__":
-    migrate_trans_types("../data/teoalida_data.xlsx")  # Change path as needed
+    try:
+        migrate_trans_types("../data/teoalida_data.xlsx")  # Change path as needed
+    finally:
+        dispose_engines()
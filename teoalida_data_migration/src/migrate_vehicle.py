@@ -1,10 +1,17 @@
+import argparse
 import pandas as pd
 import time
+import uuid
+from contextlib import nullcontext
 from datetime import datetime
 from sqlalchemy import text
 from sqlalchemy.orm import sessionmaker
-from sqlalchemy.exc import OperationalError
-from db_connection import get_db_connection
+from db_connection import dispose_engines, get_db_connection
+from workbook import read_workbook, iter_workbook_chunks, column_mapping
+from lookups import lookup_keys, upsert_lookup
+from bulk_loader import copy_dataframe, parallel_copy_dataframe
+from vehicle_staging import load_vehicles_via_staging
+from bulk_maintenance import deferred_maintenance
 from models import Base
 from models.model import Model
 from models.fuel_types import FuelType
@@ -14,6 +21,19 @@ from models.vehicles import Vehicle
 from models.trans_types import TransType
 from models.drive_train_types import DrivetrainType
 
+# Sheet columns this migration reads: {sheet column: (table column, dtype)}
+COLUMNS = {
+    "Model": ("model_name", object),
+    "Trim": ("trim", object),
+    "Engine type ": ("engine_type_name", "category"),
+    "Fuel type": ("fuel_type_name", "category"),
+    "Transmission": ("trans_type_name", "category"),
+    "Drive type": ("drivetrain_type_name", "category"),
+    "Body type": ("body_type_name", "category"),
+    "Car classification": ("vehicle_type", "category"),
+    "Image URL": ("vehicle_image", object),
+}
+
 def log_message(message):
     print(f"[{datetime.now()}] {message}")
 
@@ -21,16 +41,6 @@ def get_session(engine):
     Session = sessionmaker(bind=engine)
     return Session()
 
-def ensure_session_alive(session, engine):
-    try:
-        session.execute(text("SELECT 1"))
-        return session
-    except OperationalError:
-        log_message("Session is invalid. Recreating session...")
-        session.rollback()
-        session.close()
-        return get_session(engine)
-
 def get_valid_enum(session, enum_name):
     try:
         result = session.execute(text(f'SELECT unnest(enum_range(NULL::{enum_name}))')).fetchall()
@@ -39,121 +49,116 @@ def get_valid_enum(session, enum_name):
         log_message(f"Error fetching enum '{enum_name}': {e}")
         return set()
 
-def cache_existing(session, model_class, field_name, id_field="id"):
-    """Cache existing objects from DB as {field_value: id} dict."""
-    records = session.query(model_class).all()
-    return {getattr(r, field_name): getattr(r, id_field) for r in records}
-
-def bulk_get_or_create(session, model_class, field_name, values, id_field="id"):
+def resolve_lookup(session, lookup_cache, model_class, field_name, values, id_field="id"):
     """
-    Given a set of values, check which exist in DB, insert missing ones,
-    then return mapping value -> id for all.
+    Like upsert_lookup, but only goes to the database for values not already
+    in `lookup_cache`. Used to keep lookup maps across streamed chunks.
     """
-    existing = cache_existing(session, model_class, field_name, id_field)
-    to_create = [v for v in values if v and v not in existing]
-
-    if to_create:
-        session.bulk_save_objects([model_class(**{field_name: v}) for v in to_create])
-        session.commit()
+    if lookup_cache is None:
+        return upsert_lookup(session, model_class, field_name, values, id_field)
 
-    # Refresh cache after insert
-    existing.update(cache_existing(session, model_class, field_name, id_field))
-    return existing
+    cached = lookup_cache.setdefault(model_class.__tablename__, {})
+    missing = {v for v in values if v not in cached}
+    if missing:
+        cached.update(upsert_lookup(session, model_class, field_name, missing, id_field))
+    return cached
 
 def normalize_drive_type(drive_type):
     if pd.isna(drive_type) or not isinstance(drive_type, str):
         return None
     return ''.join(word[0].upper() for word in drive_type.strip().split())
 
-def transform_vehicle_data(df, session, engine, valid_fuel_types, valid_trans_types, valid_body_types):
+def strip_text(value):
+    return value.strip() if isinstance(value, str) else None
+
+def map_distinct(series, function):
+    """Apply a scalar function to each distinct value once and broadcast the results back."""
+    return series.astype(object).map({value: function(value) for value in series.dropna().unique()})
+
+def transform_vehicle_data(df, session, engine, valid_fuel_types, valid_trans_types, valid_body_types, lookup_cache=None):
     log_message("Transforming vehicle data...")
 
-    df = df.rename(columns={
-        "Model": "model_name",
-        "Trim": "trim",
-        "Engine type ": "engine_type_name",
-        "Fuel type": "fuel_type_name",
-        "Transmission": "trans_type_name",
-        "Drive type": "drivetrain_type_name",
-        "Body type": "body_type_name",
-        "Car classification": "vehicle_type",
-        "Image URL": "vehicle_image",
-    })
-
-    # Pre-collect all unique values for lookups
-    model_names = set(df["model_name"].dropna().unique())
-    engine_type_names = set(df["engine_type_name"].dropna().unique())
-
-    fuel_type_names = set(
-        v.strip() for v in df["fuel_type_name"].dropna().unique()
-        if v.strip() in valid_fuel_types
-    )
-    trans_type_names = set(
-        v.strip() for v in df["trans_type_name"].dropna().unique()
-        if v.strip() in valid_trans_types
-    )
-    drivetrain_names = set(
-        normalize_drive_type(v) for v in df["drivetrain_type_name"].dropna().unique()
-    )
-    drivetrain_names.discard(None)
-
-    body_type_names = set(
-        v.strip() for v in df["body_type_name"].dropna().unique()
-        if v.strip() in valid_body_types
-    )
+    df = df.rename(columns=column_mapping(COLUMNS))
+
+    # Pre-collect all unique values for lookups; per-value cleanup runs once per distinct value
+    model_keys = lookup_keys(df["model_name"])
+    engine_type_keys = lookup_keys(df["engine_type_name"])
+    model_names = set(model_keys.dropna().unique())
+    engine_type_names = set(engine_type_keys.dropna().unique())
+
+    fuel_types = map_distinct(df["fuel_type_name"], strip_text)
+    trans_types = map_distinct(df["trans_type_name"], strip_text)
+    drivetrains = map_distinct(df["drivetrain_type_name"], normalize_drive_type)
+    body_types = map_distinct(df["body_type_name"], strip_text)
+
+    fuel_type_names = set(fuel_types.dropna().unique()) & valid_fuel_types
+    trans_type_names = set(trans_types.dropna().unique()) & valid_trans_types
+    drivetrain_names = set(drivetrains.dropna().unique())
+    body_type_names = set(body_types.dropna().unique()) & valid_body_types
 
     # Bulk get or create mappings
-    model_map = bulk_get_or_create(session, Model, "name", model_names)
-    engine_type_map = bulk_get_or_create(session, EngineType, "name", engine_type_names, "EngineTypeID")
-    fuel_type_map = bulk_get_or_create(session, FuelType, "FuelType", fuel_type_names, "FuelTypeID")
-    trans_type_map = bulk_get_or_create(session, TransType, "TransType", trans_type_names, "TransTypeID")
-    drivetrain_map = bulk_get_or_create(session, DrivetrainType, "Type", drivetrain_names, "DrivetrainTypeID")
-    body_type_map = bulk_get_or_create(session, BodyType, "Type", body_type_names)
-
-    vehicles = []
-
-    for _, row in df.iterrows():
-        model_id = model_map.get(row.get("model_name"))
-        engine_type_id = engine_type_map.get(row.get("engine_type_name"))
-
-        fuel_raw = row.get("fuel_type_name")
-        fuel_type_id = fuel_type_map.get(fuel_raw.strip()) if isinstance(fuel_raw, str) else None
-
-        trans_raw = row.get("trans_type_name")
-        trans_type_id = trans_type_map.get(trans_raw.strip()) if isinstance(trans_raw, str) else None
-
-        drive_raw = row.get("drivetrain_type_name")
-        drivetrain_type_name = normalize_drive_type(drive_raw)
-        drivetrain_type_id = drivetrain_map.get(drivetrain_type_name)
-
-        body_raw = row.get("body_type_name")
-        body_type_id = body_type_map.get(body_raw.strip()) if isinstance(body_raw, str) else None
-
-        vehicle = Vehicle(
-            trim=row.get("trim"),
-            model_id=model_id,
-            engine_type=engine_type_id,
-            vehicle_type=row.get("vehicle_type"),
-            fuel_type=fuel_type_id,
-            vehicle_image=row.get("vehicle_image"),
-            transmission=trans_type_id,
-            drivetrain=drivetrain_type_id,
-            body_type=body_type_id,
-            created_at=datetime.now(),
-            updated_at=datetime.now()
-        )
-        vehicles.append(vehicle)
+    model_map = resolve_lookup(session, lookup_cache, Model, "name", model_names)
+    engine_type_map = resolve_lookup(session, lookup_cache, EngineType, "name", engine_type_names, "EngineTypeID")
+    fuel_type_map = resolve_lookup(session, lookup_cache, FuelType, "FuelType", fuel_type_names, "FuelTypeID")
+    trans_type_map = resolve_lookup(session, lookup_cache, TransType, "TransType", trans_type_names, "TransTypeID")
+    drivetrain_map = resolve_lookup(session, lookup_cache, DrivetrainType, "Type", drivetrain_names, "DrivetrainTypeID")
+    body_type_map = resolve_lookup(session, lookup_cache, BodyType, "Type", body_type_names)
+
+    now = datetime.now()
+    vehicles = pd.DataFrame({
+        "id": [uuid.uuid4() for _ in range(len(df))],
+        "trim": df["trim"],
+        "model_id": model_keys.map(model_map),
+        "engine_type": engine_type_keys.map(engine_type_map),
+        "vehicle_type": df["vehicle_type"],
+        "fuel_type": fuel_types.map(fuel_type_map),
+        "vehicle_image": df["vehicle_image"],
+        "transmission": trans_types.map(trans_type_map),
+        "drivetrain": drivetrains.map(drivetrain_map),
+        "body_type": body_types.map(body_type_map),
+        "created_at": now,
+        "updated_at": now,
+    }, index=df.index).reset_index(drop=True)
 
     log_message("Vehicle data transformation complete.")
     return vehicles
 
-def migrate_vehicle_data(file_path):
+def insert_vehicles(engine, vehicles, parallel=1):
+    """COPY a transformed vehicle batch into the vehicles table, over `parallel` connections if > 1."""
+    if parallel > 1:
+        # Partition on the vehicle's attributes, not its random id or the shared timestamps
+        key_columns = [c for c in vehicles.columns if c not in ("id", "created_at", "updated_at")]
+        return parallel_copy_dataframe(engine, Vehicle.__tablename__, vehicles, parallel, key_columns=key_columns)
+    return copy_dataframe(engine, Vehicle.__tablename__, vehicles)
+
+def migrate_vehicle_data(file_path, stream=False, chunksize=10000, staging=False, parallel=1,
+                         defer_constraints=False):
+    """
+    Migrate vehicles from the workbook. With `stream=True` the sheet is read,
+    transformed and loaded `chunksize` rows at a time so memory stays flat, apart from
+    the small per-row digests that drop repeated rows across chunks (see
+    iter_workbook_chunks).
+
+    With `staging=True` the raw columns are COPYed into a staging table and Postgres
+    resolves the lookups and inserts every vehicle in one statement (see
+    vehicle_staging); `stream` then only controls how the sheet is read.
+
+    With `parallel` > 1 each transformed batch is split by a hash of its columns and
+    loaded over that many connections at once, committing only if every part loaded.
+    The staging load is a single statement, so it can't be combined with `parallel`.
+
+    With `defer_constraints=True` the vehicles table's secondary indexes and foreign
+    keys are dropped for the load and rebuilt and validated afterwards, for full
+    refreshes of the catalog.
+    """
+    if staging and parallel > 1:
+        raise ValueError("parallel loading doesn't apply to the staging load; use one or the other")
+
     session = None
     try:
-        log_message("Loading data from Excel...")
-        data = pd.read_excel(file_path).drop_duplicates()
-
-        engine = get_db_connection()
+        # One connection per partition plus the session's; the default pool would make
+        # partitions past its size wait out pool_timeout and fail the whole load
+        engine = get_db_connection("bulk", pool_size=parallel + 1) if parallel > 1 else get_db_connection("bulk")
         session = get_session(engine)
 
         log_message("Fetching valid enum values...")
@@ -164,27 +169,68 @@ def migrate_vehicle_data(file_path):
         log_message("Creating tables if not exist...")
         Base.metadata.create_all(engine)
 
-        vehicles = transform_vehicle_data(data, session, engine, valid_fuel_types, valid_trans_types, valid_body_types)
-
-        log_message(f"Inserting {len(vehicles)} vehicle records in bulk...")
-        batch_size = 500  # optional batch size, adjust if needed
-        for i in range(0, len(vehicles), batch_size):
-            batch = vehicles[i:i+batch_size]
-            session.bulk_save_objects(batch)
-            session.commit()
-            log_message(f"Inserted batch {i // batch_size + 1}")
+        # Release this session's locks so the deferred DDL isn't stuck behind them
+        session.commit()
+        maintenance = deferred_maintenance(engine, Vehicle.__tablename__) if defer_constraints else nullcontext()
+        with maintenance:
+            if staging:
+                if stream:
+                    frames = iter_workbook_chunks(file_path, chunksize, columns=COLUMNS, unique_rows=True)
+                else:
+                    frames = [read_workbook(file_path, COLUMNS, unique_rows=True)]
+                names = column_mapping(COLUMNS)
+                load_vehicles_via_staging(engine, (frame.rename(columns=names) for frame in frames),
+                                          valid_fuel_types, valid_trans_types, valid_body_types)
+            elif stream:
+                log_message(f"Streaming data from Excel in chunks of {chunksize} rows...")
+                lookup_cache = {}
+                total = 0
+                chunks = iter_workbook_chunks(file_path, chunksize, columns=COLUMNS, unique_rows=True)
+                for chunk_number, chunk in enumerate(chunks, start=1):
+                    vehicles = transform_vehicle_data(chunk, session, engine, valid_fuel_types, valid_trans_types,
+                                                      valid_body_types, lookup_cache)
+                    insert_vehicles(engine, vehicles, parallel)
+                    total += len(vehicles)
+                    log_message(f"Chunk {chunk_number}: inserted {len(vehicles)} vehicles ({total} total)")
+            else:
+                log_message("Loading data from Excel...")
+                data = read_workbook(file_path, COLUMNS, unique_rows=True)
+
+                vehicles = transform_vehicle_data(data, session, engine, valid_fuel_types, valid_trans_types, valid_body_types)
+
+                log_message(f"Inserting {len(vehicles)} vehicle records in bulk...")
+                insert_vehicles(engine, vehicles, parallel)
 
         log_message("Data migration completed successfully.")
 
     except FileNotFoundError:
         log_message(f"File not found: {file_path}")
+        raise
     except Exception as e:
         log_message(f"Unexpected error: {e}")
         if session:
             session.rollback()
+        raise
     finally:
         if session:
             session.close()
 
 if __name__ == "__main__":
-    migrate_vehicle_data("../data/teoalida_data.xlsx")
+    parser = argparse.ArgumentParser(description="Migrate vehicles from the workbook.")
+    parser.add_argument("file_path", nargs="?", default="../data/teoalida_data.xlsx")
+    parser.add_argument("--stream", action="store_true", help="Read the sheet in chunks to keep memory flat.")
+    parser.add_argument("--chunksize", type=int, default=10000, help="Rows per chunk with --stream.")
+    parser.add_argument("--staging", action="store_true",
+                        help="COPY raw rows into a staging table and resolve lookups inside Postgres.")
+    parser.add_argument("--parallel", type=int, default=1, help="Connections to load each batch over.")
+    parser.add_argument("--defer-constraints", action="store_true",
+                        help="Drop indexes and foreign keys during the load and rebuild them at the end.")
+    args = parser.parse_args()
+    if args.staging and args.parallel > 1:
+        parser.error("--parallel can't be combined with --staging")
+
+    try:
+        migrate_vehicle_data(args.file_path, stream=args.stream, chunksize=args.chunksize, staging=args.staging,
+                             parallel=args.parallel, defer_constraints=args.defer_constraints)
+    finally:
+        dispose_engines()
@@ -3,7 +3,6 @@ from sqlalchemy import Column, String, Integer, DateTime
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
 from models import Base
-from models import model
 
 class Manufacturer(Base):
     """Define Manufacturer table with primary key."""
@@ -26,3 +25,7 @@ class Manufacturer(Base):
     updated_at = Column(DateTime)
 
     models = relationship("Model", back_populates="manufacturer_relation")
+
+
+# Imported after Manufacturer exists: models.model imports it back from this module
+from models import model  # noqa: E402,F401
@@ -0,0 +1,87 @@
+import gzip
+import hashlib
+import os
+import tempfile
+import time
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "data", ".cache", "responses")
+DEFAULT_MAX_AGE = 7 * 24 * 3600  # seconds a cached page is reused before it's fetched again
+
+
+class ResponseCache:
+    """
+    On-disk cache of raw search pages, one file per URL named by the URL's SHA-256.
+
+    Pages older than `max_age` seconds are treated as missing (None keeps them forever).
+    In `replay` mode the cache is the only source: callers must not go to the network,
+    and expiry is ignored so an old capture can be re-parsed offline.
+    """
+
+    def __init__(self, directory=DEFAULT_CACHE_DIR, max_age=DEFAULT_MAX_AGE, compress=True, replay=False,
+                 enabled=True):
+        self.directory = os.path.abspath(directory)
+        self.max_age = max_age
+        self.compress = compress
+        self.replay = replay
+        self.enabled = enabled or replay
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(url):
+        return hashlib.sha256(url.encode("utf-8")).hexdigest()
+
+    def _paths(self, url):
+        key = self.key(url)
+        base = os.path.join(self.directory, key[:2], key)
+        return f"{base}.html.gz", f"{base}.html"
+
+    def get(self, url):
+        """Return the cached page for `url`, or None if it isn't cached or has expired."""
+        if not self.enabled:
+            return None
+        for path in self._paths(url):
+            if not os.path.exists(path):
+                continue
+            if not self.replay and self.max_age is not None and time.time() - os.path.getmtime(path) > self.max_age:
+                break
+            opener = gzip.open if path.endswith(".gz") else open
+            with opener(path, "rt", encoding="utf-8") as file:
+                self.hits += 1
+                return file.read()
+        self.misses += 1
+        return None
+
+    def put(self, url, text):
+        """Store a page, replacing any earlier copy atomically."""
+        if not self.enabled or self.replay or text is None:
+            return
+        compressed_path, plain_path = self._paths(url)
+        path = compressed_path if self.compress else plain_path
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        data = text.encode("utf-8")
+        if self.compress:
+            data = gzip.compress(data)
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        with os.fdopen(fd, "wb") as file:
+            file.write(data)
+        os.replace(temp_path, path)
+
+        stale = plain_path if self.compress else compressed_path
+        if os.path.exists(stale):
+            os.remove(stale)
+
+
+_cache = ResponseCache()
+
+
+def get_response_cache():
+    return _cache
+
+
+def configure_response_cache(**options):
+    """Replace the process-wide cache used by every scraping backend."""
+    global _cache
+    _cache = ResponseCache(**options)
+    return _cache
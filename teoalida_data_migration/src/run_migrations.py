@@ -0,0 +1,158 @@
+import argparse
+import importlib
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from db_connection import dispose_engines, get_db_connection
+from utils import log_message
+from workbook import read_workbook
+
+
+def _stage(module_name, function_name):
+    """Import a migration entry point lazily so a stage's dependencies load only when it runs."""
+    def run(file_path):
+        return getattr(importlib.import_module(module_name), function_name)(file_path)
+    return run
+
+
+# Stage name -> (entry point, stages that must finish first)
+STAGES = {
+    "manufacturers": (_stage("migrate_data", "migrate_manufacturers"), []),
+    "models": (_stage("Model_data", "migrate_models"), ["manufacturers"]),
+    "fuel_types": (_stage("fuel_type_migration", "migrate_fuel_types"), []),
+    "body_types": (_stage("migrate_body_types", "migrate_body_types"), []),
+    "trans_types": (_stage("migrate_trans_types", "migrate_trans_types"), []),
+    "drivetrain_types": (_stage("drivetrain_types", "migrate_drivetrain_types"), []),
+    "engine_types": (_stage("migrate_engine_types", "migrate_engine_types"), []),
+    "ee_architectures": (_stage("migrate_ee_architectures", "migrate_ee_architectures"), []),
+    "vehicles": (_stage("migrate_vehicle", "migrate_vehicle_data"),
+                 ["models", "fuel_types", "body_types", "trans_types", "drivetrain_types", "engine_types"]),
+    "ecu_versions": (_stage("ECU_version", "migrate_ecu_data_from_excel"), ["vehicles"]),
+}
+
+
+# Model modules behind the tables of the stages that start together; their tables are
+# created once up front. vehicles and ECU_version are left to their own stages, which
+# start only after their dependencies have finished.
+SCHEMA_MODELS = [
+    "models.manufacturer",
+    "models.model",
+    "models.fuel_types",
+    "models.body_types",
+    "models.trans_types",
+    "models.drive_train_types",
+    "models.engine_types",
+    "models.EE_architechures",
+]
+
+
+def create_schema():
+    """
+    Create the pipeline's tables and enum types before any stage starts. The stages
+    also call create_all on the shared metadata, and concurrent calls on a fresh
+    database race to CREATE the same relations; afterwards theirs find nothing to do.
+    """
+    from models import Base
+    for module_name in SCHEMA_MODELS:
+        importlib.import_module(module_name)
+    # Just these tables: the metadata may also hold vehicles by now, whose model FK
+    # create_all can't resolve
+    tables = [mapper.local_table for mapper in Base.registry.mappers
+              if mapper.class_.__module__ in SCHEMA_MODELS]
+    Base.metadata.create_all(get_db_connection(), tables=tables)
+
+
+def select_stages(only=None):
+    """Return the requested stages plus everything they depend on."""
+    if not only:
+        return list(STAGES)
+    selected = set()
+    pending = list(only)
+    while pending:
+        name = pending.pop()
+        if name not in STAGES:
+            raise ValueError(f"Unknown stage '{name}'. Known stages: {', '.join(STAGES)}")
+        if name not in selected:
+            selected.add(name)
+            pending.extend(STAGES[name][1])
+    return [name for name in STAGES if name in selected]
+
+
+def run_pipeline(file_path, stages=None, max_workers=4):
+    """
+    Run the migration stages as a DAG, starting each stage as soon as its dependencies
+    have finished. Independent stages run concurrently, each on its own connection.
+    Returns {stage: (status, seconds)}; a stage whose dependency failed is skipped.
+    The pooled database connections are closed once every stage has finished.
+    """
+    stages = stages or list(STAGES)
+    results = {}
+
+    # Parse the workbook once up front so concurrent stages share the snapshot
+    read_workbook(file_path)
+    try:
+        create_schema()
+
+        started_at = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            running = {}
+            remaining = list(stages)
+
+            while remaining or running:
+                for name in list(remaining):
+                    deps = [dep for dep in STAGES[name][1] if dep in stages]
+                    if any(results.get(dep, ("",))[0] in ("failed", "skipped") for dep in deps):
+                        log_message(f"[{name}] Skipped because a dependency did not succeed.")
+                        results[name] = ("skipped", 0.0)
+                        remaining.remove(name)
+                    elif all(results.get(dep, ("",))[0] == "ok" for dep in deps):
+                        log_message(f"[{name}] Starting...")
+                        future = executor.submit(_timed, STAGES[name][0], file_path)
+                        running[future] = name
+                        remaining.remove(name)
+
+                if not running:
+                    continue
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    status, seconds, error = future.result()
+                    results[name] = (status, seconds)
+                    if error:
+                        log_message(f"[{name}] Failed after {seconds:.2f}s: {error}")
+                    else:
+                        log_message(f"[{name}] Finished in {seconds:.2f}s")
+    finally:
+        # Every stage is done with the pooled connections
+        dispose_engines()
+
+    total = time.perf_counter() - started_at
+    log_message("Stage timings:")
+    for name in stages:
+        status, seconds = results[name]
+        log_message(f"  {name:<18} {status:<8} {seconds:8.2f}s")
+    log_message(f"Pipeline wall-clock time: {total:.2f}s")
+    return results
+
+
+def _timed(function, file_path):
+    """Run a stage and return (status, seconds, error)."""
+    start = time.perf_counter()
+    try:
+        function(file_path)
+        return "ok", time.perf_counter() - start, None
+    except Exception as e:
+        return "failed", time.perf_counter() - start, e
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the Teoalida migrations in dependency order.")
+    parser.add_argument("file_path", nargs="?", default="../data/teoalida_data.xlsx")
+    parser.add_argument("--only", nargs="+", metavar="STAGE",
+                        help="Run only these stages (and the stages they depend on).")
+    parser.add_argument("--workers", type=int, default=4, help="Maximum number of stages run at once.")
+    args = parser.parse_args()
+
+    results = run_pipeline(args.file_path, select_stages(args.only), args.workers)
+    if any(status != "ok" for status, _ in results.values()):
+        raise SystemExit(1)
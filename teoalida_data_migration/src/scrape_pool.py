@@ -0,0 +1,126 @@
+import queue
+import threading
+from collections import namedtuple
+from itertools import zip_longest
+from utils import log_message
+
+# One (make, model, year) search and the vehicle its parts belong to
+ScrapeTarget = namedtuple("ScrapeTarget", ["make", "model", "year", "vehicle_id"])
+
+_DONE = object()
+
+
+def target_host(target):
+    """Host a target's search page is served from."""
+    return f"{target.make.lower()}.oempartsonline.com"
+
+
+def interleave_by_host(targets):
+    """Order targets round-robin across hosts so workers rarely wait on the same host."""
+    by_host = {}
+    for target in targets:
+        by_host.setdefault(target_host(target), []).append(target)
+    return [target for group in zip_longest(*by_host.values()) for target in group if target is not None]
+
+
+class HostLimiter:
+    """Caps how many workers may load pages from the same host at once."""
+
+    def __init__(self, per_host_limit):
+        self.per_host_limit = per_host_limit
+        self._semaphores = {}
+        self._lock = threading.Lock()
+
+    def slot(self, host):
+        with self._lock:
+            if host not in self._semaphores:
+                self._semaphores[host] = threading.BoundedSemaphore(self.per_host_limit)
+            return self._semaphores[host]
+
+
+def run_scrape_pool(targets, scrape, create_driver, workers=4, per_host_limit=2, recycle_after=200):
+    """
+    Scrape `targets` with `workers` threads and yield (target, parts) as they finish.
+
+    Each worker pulls targets from a shared queue; `scrape(target, get_driver)` returns
+    the parts for one target, or None if the page couldn't be scraped (as does an
+    exception). `get_driver()` hands out the worker's own browser from
+    `create_driver()`, started on first use so scrapes that don't need one never
+    launch it, and replaced after `recycle_after` pages to cap the memory a long-lived
+    Chrome accumulates. At most `per_host_limit` pages load from any one host at a time.
+    Results are yielded to the caller's thread, which acts as the single writer;
+    workers block once a few results per worker are waiting, so a slow consumer
+    throttles the scrape.
+    """
+    tasks = queue.Queue()
+    for target in interleave_by_host(targets):
+        tasks.put(target)
+
+    workers = max(1, min(workers, tasks.qsize() or 1))
+    results = queue.Queue(maxsize=workers * 2)
+    limiter = HostLimiter(per_host_limit)
+    stop = threading.Event()
+    # undetected_chromedriver patches its driver binary on start-up, which races between threads
+    driver_lock = threading.Lock()
+
+    def quit_driver(browser):
+        try:
+            browser.pop("driver").quit()
+        except Exception:
+            pass
+
+    def worker(number):
+        browser = {"pages": 0}
+
+        def get_driver():
+            if "driver" in browser and recycle_after and browser["pages"] >= recycle_after:
+                log_message(f"[Worker {number}] Recycling browser after {browser['pages']} pages")
+                quit_driver(browser)
+            if "driver" not in browser:
+                with driver_lock:
+                    browser["driver"] = create_driver()
+                browser["pages"] = 0
+            browser["pages"] += 1
+            return browser["driver"]
+
+        try:
+            while not stop.is_set():
+                try:
+                    target = tasks.get_nowait()
+                except queue.Empty:
+                    break
+                try:
+                    with limiter.slot(target_host(target)):
+                        parts = scrape(target, get_driver)
+                except Exception as e:
+                    log_message(f"[Worker {number}] Scrape failed for {target.make} {target.model} {target.year}: {e}")
+                    parts = None
+                results.put((target, parts))
+        finally:
+            if "driver" in browser:
+                quit_driver(browser)
+            results.put(_DONE)
+
+    log_message(f"Scraping {tasks.qsize()} targets with {workers} workers (max {per_host_limit} per host)")
+    threads = [threading.Thread(target=worker, args=(n,), daemon=True) for n in range(1, workers + 1)]
+    for thread in threads:
+        thread.start()
+
+    try:
+        finished = 0
+        while finished < workers:
+            item = results.get()
+            if item is _DONE:
+                finished += 1
+                continue
+            yield item
+    finally:
+        stop.set()
+        # Unblock workers still waiting to hand over a result
+        while any(thread.is_alive() for thread in threads):
+            try:
+                results.get(timeout=0.1)
+            except queue.Empty:
+                pass
+        for thread in threads:
+            thread.join()
@@ -0,0 +1,197 @@
+import os
+import socket
+import sqlite3
+import time
+import uuid
+from scrape_pool import ScrapeTarget
+from utils import log_message
+
+PENDING = "pending"
+IN_FLIGHT = "in_flight"
+DONE = "done"
+FAILED = "failed"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS scrape_targets (
+    make TEXT NOT NULL,
+    model TEXT NOT NULL,
+    year INTEGER NOT NULL,
+    vehicle_id TEXT NOT NULL,
+    state TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    last_error TEXT,
+    worker TEXT,
+    claimed_at REAL,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (make, model, year)
+);
+CREATE INDEX IF NOT EXISTS scrape_targets_state ON scrape_targets (state, claimed_at);
+"""
+
+
+def default_worker_id():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+class ScrapeQueue:
+    """
+    Durable ECU scrape work queue in a local SQLite file.
+
+    Each (make, model, year) target is pending, in_flight, done or failed. Claiming
+    moves targets to in_flight under an exclusive write transaction, so several
+    processes can drain the same file. A claim held longer than `lease` seconds (its
+    process died) is handed out again. A target that fails goes back to pending until
+    it has been tried `max_attempts` times, and then stays failed with its last error.
+    """
+
+    def __init__(self, path, lease=15 * 60, max_attempts=3, worker=None):
+        self.path = path
+        self.lease = lease
+        self.max_attempts = max_attempts
+        self.worker = worker or default_worker_id()
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        # Autocommit mode: transactions below are explicit
+        self.connection = sqlite3.connect(path, timeout=30, isolation_level=None)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.executescript(SCHEMA)
+
+    def close(self):
+        self.connection.close()
+
+    def add(self, targets):
+        """
+        Queue targets that aren't in the file yet; returns how many were new.
+
+        Unfinished targets already in the file take the vehicle id given here, so a
+        queue resumed after the vehicles were reloaded doesn't point at deleted rows.
+        """
+        now = time.time()
+        # Several sheet rows can name the same target; the first one's vehicle wins
+        rows = {}
+        for t in targets:
+            rows.setdefault((str(t.make), str(t.model), int(t.year)), str(t.vehicle_id))
+        rows = [(*key, vehicle_id, now) for key, vehicle_id in rows.items()]
+        with self.connection:
+            self.connection.execute("BEGIN IMMEDIATE")
+            before = self.connection.execute("SELECT COUNT(*) FROM scrape_targets").fetchone()[0]
+            changes = self.connection.total_changes
+            self.connection.executemany(
+                "INSERT INTO scrape_targets (make, model, year, vehicle_id, updated_at) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT (make, model, year) DO UPDATE SET vehicle_id = excluded.vehicle_id, "
+                "updated_at = excluded.updated_at "
+                "WHERE state != 'done' AND vehicle_id != excluded.vehicle_id",
+                rows,
+            )
+            added = self.connection.execute("SELECT COUNT(*) FROM scrape_targets").fetchone()[0] - before
+            refreshed = self.connection.total_changes - changes - added
+        log_message(f"[Queue] {added} new targets queued ({len(rows) - added} already known, "
+                    f"{refreshed} with a new vehicle id)")
+        return added
+
+    def retire_missing(self, targets):
+        """Fail unfinished targets that aren't in `targets`, i.e. no longer match a vehicle."""
+        keep = {(str(t.make), str(t.model), int(t.year)) for t in targets}
+        with self.connection:
+            self.connection.execute("BEGIN IMMEDIATE")
+            stale = [
+                key for key in self.connection.execute(
+                    "SELECT make, model, year FROM scrape_targets WHERE state IN (?, ?)", (PENDING, IN_FLIGHT)
+                )
+                if key not in keep
+            ]
+            self.connection.executemany(
+                "UPDATE scrape_targets SET state = ?, last_error = ?, worker = NULL, claimed_at = NULL, "
+                "updated_at = ? WHERE make = ? AND model = ? AND year = ?",
+                [(FAILED, "No matching vehicle", time.time(), *key) for key in stale],
+            )
+        if stale:
+            log_message(f"[Queue] {len(stale)} queued targets no longer match a vehicle")
+        return len(stale)
+
+    def claim(self, limit):
+        """Mark up to `limit` pending (or abandoned in-flight) targets as ours and return them."""
+        now = time.time()
+        with self.connection:
+            self.connection.execute("BEGIN IMMEDIATE")
+            rows = self.connection.execute(
+                "SELECT make, model, year, vehicle_id FROM scrape_targets "
+                "WHERE state = ? OR (state = ? AND claimed_at < ?) "
+                "ORDER BY attempts, make, model, year LIMIT ?",
+                (PENDING, IN_FLIGHT, now - self.lease, limit),
+            ).fetchall()
+            self.connection.executemany(
+                "UPDATE scrape_targets SET state = ?, worker = ?, claimed_at = ?, updated_at = ? "
+                "WHERE make = ? AND model = ? AND year = ?",
+                [(IN_FLIGHT, self.worker, now, now, make, model, year) for make, model, year, _ in rows],
+            )
+        return [ScrapeTarget(make, model, year, uuid.UUID(vehicle_id)) for make, model, year, vehicle_id in rows]
+
+    def drain(self, chunk_size=500):
+        """Yield claimed chunks of targets until nothing is left to claim."""
+        while True:
+            chunk = self.claim(chunk_size)
+            if not chunk:
+                return
+            yield chunk
+            self.log_progress()
+
+    def mark_done(self, targets):
+        now = time.time()
+        with self.connection:
+            self.connection.execute("BEGIN IMMEDIATE")
+            self.connection.executemany(
+                "UPDATE scrape_targets SET state = ?, attempts = attempts + 1, last_error = NULL, "
+                "worker = NULL, claimed_at = NULL, updated_at = ? WHERE make = ? AND model = ? AND year = ?",
+                [(DONE, now, t.make, t.model, int(t.year)) for t in targets],
+            )
+
+    def mark_failed(self, targets, error):
+        """Record a failed attempt; targets out of attempts stay failed, the rest are retried."""
+        now = time.time()
+        with self.connection:
+            self.connection.execute("BEGIN IMMEDIATE")
+            self.connection.executemany(
+                "UPDATE scrape_targets SET attempts = attempts + 1, last_error = ?, worker = NULL, "
+                "claimed_at = NULL, updated_at = ?, "
+                "state = CASE WHEN attempts + 1 >= ? THEN ? ELSE ? END "
+                "WHERE make = ? AND model = ? AND year = ?",
+                [(str(error), now, self.max_attempts, FAILED, PENDING, t.make, t.model, int(t.year))
+                 for t in targets],
+            )
+
+    def release(self):
+        """Put this worker's unfinished claims back to pending, e.g. when a run stops early."""
+        with self.connection:
+            released = self.connection.execute(
+                "UPDATE scrape_targets SET state = ?, worker = NULL, claimed_at = NULL, updated_at = ? "
+                "WHERE state = ? AND worker = ?",
+                (PENDING, time.time(), IN_FLIGHT, self.worker),
+            ).rowcount
+        if released:
+            log_message(f"[Queue] Released {released} unfinished targets")
+        return released
+
+    def retry_failed(self):
+        """Give failed targets a fresh set of attempts."""
+        with self.connection:
+            retried = self.connection.execute(
+                "UPDATE scrape_targets SET state = ?, attempts = 0, updated_at = ? WHERE state = ?",
+                (PENDING, time.time(), FAILED),
+            ).rowcount
+        log_message(f"[Queue] {retried} failed targets queued again")
+        return retried
+
+    def counts(self):
+        """Return {state: number of targets}."""
+        counts = dict.fromkeys((PENDING, IN_FLIGHT, DONE, FAILED), 0)
+        counts.update(self.connection.execute("SELECT state, COUNT(*) FROM scrape_targets GROUP BY state"))
+        return counts
+
+    def log_progress(self):
+        counts = self.counts()
+        total = sum(counts.values())
+        log_message(
+            f"[Queue] {counts[DONE]}/{total} done, {counts[FAILED]} failed, "
+            f"{counts[PENDING]} pending, {counts[IN_FLIGHT]} in flight"
+        )
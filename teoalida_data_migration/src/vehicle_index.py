@@ -0,0 +1,95 @@
+import bisect
+from sqlalchemy import select
+from models.model import Model
+from models.vehicles import Vehicle
+from utils import log_message
+
+
+def normalize_name(name):
+    """Lower-case a model name and collapse its whitespace for matching."""
+    return " ".join(str(name).lower().split())
+
+
+def _year(value):
+    """Return the year of an int, date or timestamp value, or None."""
+    if value is None:
+        return None
+    if hasattr(value, "year"):
+        return value.year
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class VehicleIndex:
+    """
+    In-memory model name -> vehicle index used to match workbook rows to vehicles.
+
+    Loaded with one query; lookups try an exact name match, then model names that
+    start with the query, then names that contain it (the old ILIKE '%name%'), and
+    within a tier prefer the row's make and year.
+    """
+
+    def __init__(self, rows):
+        # normalized model name -> [(manufacturer id, year, vehicle id), ...]
+        self.entries = {}
+        for name, manufacturer_id, year, vehicle_id in rows:
+            if name is None:
+                continue
+            self.entries.setdefault(normalize_name(name), []).append((manufacturer_id, _year(year), vehicle_id))
+        self.names = sorted(self.entries)
+        self._substring_matches = {}
+
+    @classmethod
+    def load(cls, session):
+        """Build the index from every model that has at least one vehicle."""
+        rows = session.execute(
+            select(Model.name, Model.manufacturer_id, Model.year, Vehicle.id)
+            .join(Vehicle, Vehicle.model_id == Model.id)
+            .order_by(Model.name, Vehicle.id)
+        ).all()
+        index = cls(rows)
+        log_message(f"Indexed {len(rows)} vehicles across {len(index.names)} model names")
+        return index
+
+    def _prefix_names(self, query):
+        start = bisect.bisect_left(self.names, query)
+        end = bisect.bisect_left(self.names, query + "\uffff")
+        return self.names[start:end]
+
+    def _substring_names(self, query):
+        if query not in self._substring_matches:
+            self._substring_matches[query] = [name for name in self.names if query in name]
+        return self._substring_matches[query]
+
+    def _pick(self, names, manufacturer_id, year):
+        """Return the best vehicle id among `names`, scoped to the make and preferring the year."""
+        candidates = [entry for name in names for entry in self.entries[name]]
+        if manufacturer_id is not None:
+            # Models created from vehicle rows alone have no manufacturer; they stay eligible
+            candidates = [entry for entry in candidates if entry[0] in (manufacturer_id, None)]
+        if not candidates:
+            return None
+        year = _year(year)
+        for _, candidate_year, vehicle_id in candidates:
+            if candidate_year == year:
+                return vehicle_id
+        return candidates[0][2]
+
+    def find(self, model_name, manufacturer_id=None, year=None):
+        """Return the vehicle id for a workbook model name, or None if nothing matches."""
+        query = normalize_name(model_name)
+        if not query:
+            return None
+
+        tiers = (
+            [query] if query in self.entries else [],
+            self._prefix_names(query),
+            self._substring_names(query),
+        )
+        for names in tiers:
+            vehicle_id = self._pick(names, manufacturer_id, year)
+            if vehicle_id is not None:
+                return vehicle_id
+        return None
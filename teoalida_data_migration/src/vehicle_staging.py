@@ -0,0 +1,157 @@
+import time
+from bulk_loader import copy_rows, quote_identifier
+from utils import log_message
+
+STAGING_TABLE = "vehicles_staging"
+
+# Raw workbook columns as COPYed into the staging table; all text, cleaned in SQL
+STAGING_COLUMNS = [
+    "model_name",
+    "trim",
+    "engine_type_name",
+    "fuel_type_name",
+    "trans_type_name",
+    "drivetrain_type_name",
+    "body_type_name",
+    "vehicle_type",
+    "vehicle_image",
+]
+
+# Whitespace str.strip() removes, for btrim
+WHITESPACE = "E' \\t\\r\\n\\f'"
+
+# Staged rows with the same cleanup transform_vehicle_data does in pandas: lookups
+# are trimmed, empty strings are NULL, and the drive type becomes its initials
+# ("All Wheel Drive" -> "AWD"). Repeated sheet rows are dropped before staging.
+CLEAN_ROWS = f"""
+SELECT
+    NULLIF(model_name, '') AS model_name,
+    "trim",
+    NULLIF(engine_type_name, '') AS engine_type_name,
+    NULLIF(btrim(fuel_type_name, {WHITESPACE}), '') AS fuel_type,
+    NULLIF(btrim(trans_type_name, {WHITESPACE}), '') AS trans_type,
+    NULLIF((
+        SELECT string_agg(upper(left(word, 1)), '' ORDER BY position)
+        FROM regexp_split_to_table(btrim(drivetrain_type_name, {WHITESPACE}), '\\s+')
+             WITH ORDINALITY AS words(word, position)
+    ), '') AS drivetrain,
+    NULLIF(btrim(body_type_name, {WHITESPACE}), '') AS body_type,
+    vehicle_type,
+    vehicle_image
+FROM {quote_identifier(STAGING_TABLE)} AS staged
+"""
+
+# Lookup values the tables don't have yet. models.name and engine_types.name aren't
+# unique, so those use NOT EXISTS rather than ON CONFLICT.
+LOOKUP_INSERTS = {
+    "models": """
+        INSERT INTO models (id, name, created_at, updated_at)
+        SELECT gen_random_uuid(), name, now(), now()
+        FROM (SELECT DISTINCT model_name AS name FROM clean WHERE model_name IS NOT NULL) AS names
+        WHERE NOT EXISTS (SELECT 1 FROM models WHERE models.name = names.name)
+    """,
+    "engine_types": """
+        INSERT INTO engine_types (name, created_at, updated_at)
+        SELECT name, now(), now()
+        FROM (SELECT DISTINCT engine_type_name AS name FROM clean WHERE engine_type_name IS NOT NULL) AS names
+        WHERE NOT EXISTS (SELECT 1 FROM engine_types WHERE engine_types.name = names.name)
+    """,
+    "fuel_types": """
+        INSERT INTO fuel_types ("FuelType", created_at, updated_at)
+        SELECT DISTINCT fuel_type, now(), now() FROM clean WHERE fuel_type = ANY(%(valid_fuel_types)s::text[])
+        ON CONFLICT DO NOTHING
+    """,
+    "trans_types": """
+        INSERT INTO trans_types ("TransType", created_at, updated_at)
+        SELECT DISTINCT trans_type, now(), now() FROM clean WHERE trans_type = ANY(%(valid_trans_types)s::text[])
+        ON CONFLICT DO NOTHING
+    """,
+    "drive_train_types": """
+        INSERT INTO drive_train_types ("Type", created_at, updated_at)
+        SELECT DISTINCT drivetrain, now(), now() FROM clean WHERE drivetrain IS NOT NULL
+        ON CONFLICT DO NOTHING
+    """,
+    "body_types": """
+        INSERT INTO body_types ("Type", created_at, updated_at)
+        SELECT DISTINCT body_type, now(), now() FROM clean WHERE body_type = ANY(%(valid_body_types)s::text[])
+        ON CONFLICT DO NOTHING
+    """,
+}
+
+# One set-based insert; names that repeat in models/engine_types resolve to a single id
+INSERT_VEHICLES = """
+INSERT INTO vehicles (id, "trim", model_id, engine_type, vehicle_type, fuel_type, vehicle_image,
+                      transmission, drivetrain, body_type, created_at, updated_at)
+SELECT gen_random_uuid(), clean."trim", m.id, e."EngineTypeID", clean.vehicle_type, f."FuelTypeID",
+       clean.vehicle_image, t."TransTypeID", d."DrivetrainTypeID", b.id, now(), now()
+FROM clean
+LEFT JOIN (SELECT DISTINCT ON (name) name, id FROM models ORDER BY name, id) AS m
+       ON m.name = clean.model_name
+LEFT JOIN (SELECT DISTINCT ON (name) name, "EngineTypeID" FROM engine_types ORDER BY name, "EngineTypeID") AS e
+       ON e.name = clean.engine_type_name
+LEFT JOIN fuel_types AS f
+       ON f."FuelType" = clean.fuel_type AND clean.fuel_type = ANY(%(valid_fuel_types)s::text[])
+LEFT JOIN trans_types AS t
+       ON t."TransType" = clean.trans_type AND clean.trans_type = ANY(%(valid_trans_types)s::text[])
+LEFT JOIN drive_train_types AS d
+       ON d."Type" = clean.drivetrain
+LEFT JOIN body_types AS b
+       ON b."Type" = clean.body_type AND clean.body_type = ANY(%(valid_body_types)s::text[])
+"""
+
+
+def _with_clean(sql):
+    return f"WITH clean AS ({CLEAN_ROWS}) {sql}"
+
+
+def load_vehicles_via_staging(engine, frames, valid_fuel_types, valid_trans_types, valid_body_types):
+    """
+    Load vehicles through an UNLOGGED staging table and resolve every foreign key in Postgres.
+
+    Each DataFrame in `frames` (one for a full read, or a chunk iterator when
+    streaming, both with repeated sheet rows already dropped) is COPYed raw into the
+    staging table. Missing lookup rows are then added and all vehicles inserted with
+    one INSERT ... SELECT that joins the lookup tables, so cleanup and id mapping
+    happen server-side. Everything runs in one transaction; returns the number of
+    vehicles inserted.
+    """
+    parameters = {
+        "valid_fuel_types": sorted(valid_fuel_types),
+        "valid_trans_types": sorted(valid_trans_types),
+        "valid_body_types": sorted(valid_body_types),
+    }
+    staging = quote_identifier(STAGING_TABLE)
+    raw_connection = engine.raw_connection()
+    try:
+        with raw_connection.cursor() as cursor:
+            columns = ", ".join(f"{quote_identifier(column)} text" for column in STAGING_COLUMNS)
+            cursor.execute(f"CREATE UNLOGGED TABLE IF NOT EXISTS {staging} ({columns})")
+            cursor.execute(f"TRUNCATE {staging}")
+
+            started = time.perf_counter()
+            staged = 0
+            for frame in frames:
+                staged += copy_rows(raw_connection, STAGING_TABLE, STAGING_COLUMNS,
+                                    frame[STAGING_COLUMNS].itertuples(index=False, name=None))
+            # Fresh statistics so the planner picks hash joins for the lookups
+            cursor.execute(f"ANALYZE {staging}")
+            log_message(f"Staged {staged} raw vehicle rows in {time.perf_counter() - started:.1f}s")
+
+            started = time.perf_counter()
+            for table, sql in LOOKUP_INSERTS.items():
+                cursor.execute(_with_clean(sql), parameters)
+                if cursor.rowcount:
+                    log_message(f"Added {cursor.rowcount} new {table} rows")
+
+            cursor.execute(_with_clean(INSERT_VEHICLES), parameters)
+            inserted = cursor.rowcount
+            cursor.execute(f"TRUNCATE {staging}")
+        raw_connection.commit()
+    except Exception:
+        raw_connection.rollback()
+        raise
+    finally:
+        raw_connection.close()
+
+    log_message(f"Inserted {inserted} vehicles from staging in {time.perf_counter() - started:.1f}s")
+    return inserted
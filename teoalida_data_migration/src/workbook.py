@@ -0,0 +1,229 @@
+import hashlib
+import math
+import os
+import threading
+import pandas as pd
+from openpyxl import load_workbook
+from utils import log_message
+
+CACHE_DIR_NAME = ".cache"
+
+# Parsed snapshots already loaded by this process, keyed by snapshot path
+_snapshots = {}
+_snapshots_lock = threading.Lock()
+
+# Snapshot path -> boolean array, False for rows that repeat an earlier row in every sheet column
+_unique_rows = {}
+
+
+def file_hash(file_path, block_size=1024 * 1024):
+    """Return the SHA-256 hex digest of a file's contents."""
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as file:
+        for block in iter(lambda: file.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def snapshot_path(file_path, sheet_name=0, cache_dir=None):
+    """Return the snapshot path (without extension) for a workbook's current contents."""
+    file_path = os.path.abspath(file_path)
+    cache_dir = cache_dir or os.path.join(os.path.dirname(file_path), CACHE_DIR_NAME)
+    stem = os.path.splitext(os.path.basename(file_path))[0]
+    return os.path.join(cache_dir, f"{stem}-{sheet_name}-{file_hash(file_path)[:16]}")
+
+
+def _write_snapshot(data, path):
+    """Write a parsed sheet as Parquet, falling back to pickle for columns Arrow can't type."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    try:
+        data.to_parquet(f"{path}.parquet", index=False)
+        return f"{path}.parquet"
+    except (ImportError, TypeError, ValueError) as e:
+        log_message(f"Parquet snapshot unavailable ({e}), using pickle instead.")
+        if os.path.exists(f"{path}.parquet"):
+            os.remove(f"{path}.parquet")
+        data.to_pickle(f"{path}.pkl")
+        return f"{path}.pkl"
+
+
+def _read_snapshot(path, names=None):
+    """
+    Load a snapshot written by _write_snapshot, or return None if there is none.
+
+    With `names`, only those columns are read from a Parquet snapshot; names the
+    sheet doesn't have are skipped.
+    """
+    if os.path.exists(f"{path}.parquet"):
+        if names is None:
+            return pd.read_parquet(f"{path}.parquet")
+        from pyarrow.parquet import read_schema
+        available = set(read_schema(f"{path}.parquet").names)
+        return pd.read_parquet(f"{path}.parquet", columns=[name for name in names if name in available])
+    if os.path.exists(f"{path}.pkl"):
+        data = pd.read_pickle(f"{path}.pkl")
+        return data if names is None else _project(data, names)
+    return None
+
+
+def column_mapping(columns):
+    """Return the {sheet column: table column} rename map of a column declaration."""
+    return {source: target for source, (target, _) in columns.items()}
+
+
+def _project(data, names):
+    """Keep only the declared columns the sheet actually has, in declaration order."""
+    return data[[name for name in names if name in data.columns]]
+
+
+def _apply_dtypes(data, columns):
+    """Cast the projected columns to the dtypes given in the column declaration."""
+    dtypes = {source: dtype for source, (_, dtype) in columns.items() if dtype is not None and source in data.columns}
+    return data.astype(dtypes) if dtypes else data
+
+
+def read_workbook(file_path, columns=None, sheet_name=0, cache_dir=None, use_cache=True, unique_rows=False):
+    """
+    Return the sheet as a DataFrame, parsing the workbook only when its contents change.
+
+    The first read writes a columnar snapshot next to the workbook keyed by the file's
+    content hash; later reads from any migration script load that snapshot instead.
+    Callers get their own copy and may modify it freely.
+
+    `columns` is a migration's column declaration, {sheet column: (table column, dtype)}.
+    When given, only those sheet columns are read and they are cast to the declared
+    dtypes (None keeps the inferred one). Declared columns missing from the sheet are
+    skipped, as the transforms add them as empty columns. With `use_cache=False` the
+    projection and dtypes are pushed straight into pd.read_excel.
+
+    `unique_rows` drops rows that repeat an earlier row across every sheet column, not
+    just the projected ones (the same rows pd.read_excel(...).drop_duplicates() drops),
+    so projecting doesn't merge rows that differ only in columns a migration doesn't read.
+    """
+    names = list(columns) if columns is not None else None
+
+    if not use_cache:
+        log_message(f"Parsing workbook {file_path}...")
+        usecols = (lambda name: name in columns) if columns is not None and not unique_rows else None
+        data = pd.read_excel(file_path, sheet_name=sheet_name, usecols=usecols)
+        if unique_rows:
+            data = data.drop_duplicates()
+            data = _project(data, names) if names is not None else data
+        _log_missing_columns(names, data)
+        return _apply_dtypes(data, columns) if columns is not None else data
+
+    path = snapshot_path(file_path, sheet_name, cache_dir)
+
+    with _snapshots_lock:
+        data = _read_cached(file_path, path, columns, names, sheet_name)
+        if unique_rows:
+            data = data[_unique_row_mask(file_path, path, sheet_name)]
+    _log_missing_columns(names, data)
+    return data
+
+
+def _log_missing_columns(names, data):
+    """Name the declared columns the sheet doesn't have, so a misspelt header shows up in the log."""
+    missing = [name for name in names or () if name not in data.columns]
+    if missing:
+        log_message(f"Sheet has no column(s) {', '.join(map(repr, missing))}; they are left empty")
+
+
+def _unique_row_mask(file_path, path, sheet_name):
+    """Which rows of the snapshot at `path` aren't full-row repeats; computed once per process."""
+    mask = _unique_rows.get(path)
+    if mask is None:
+        full = _snapshots.get(path)
+        if full is None:
+            full = _read_cached(file_path, path, None, None, sheet_name)
+        mask = _unique_rows[path] = ~full.duplicated().to_numpy()
+    return mask
+
+
+def _read_cached(file_path, path, columns, names, sheet_name):
+    """Serve read_workbook from the in-process, on-disk or freshly parsed snapshot."""
+    data = _snapshots.get(path)
+    if data is not None:
+        data = data.copy() if names is None else _project(data, names).copy()
+    else:
+        data = _read_snapshot(path, names)
+        if data is None:
+            log_message(f"Parsing workbook {file_path}...")
+            parsed = pd.read_excel(file_path, sheet_name=sheet_name)
+            written = _write_snapshot(parsed, path)
+            log_message(f"Saved workbook snapshot to {written}")
+            _snapshots[path] = parsed
+            data = parsed.copy() if names is None else _project(parsed, names).copy()
+        else:
+            log_message(f"Loaded workbook snapshot for {file_path}")
+            if names is None:
+                _snapshots[path] = data
+                data = data.copy()
+
+    return _apply_dtypes(data, columns) if columns is not None else data
+
+
+def _row_key(row):
+    """
+    A 16-byte digest of a raw sheet row, equal for rows pandas would call duplicates:
+    whole floats match ints (2020.0 and 2020) and NaN matches an empty cell.
+    """
+    values = []
+    for value in row:
+        if isinstance(value, float):
+            if math.isnan(value):
+                value = None
+            elif value.is_integer():
+                value = int(value)
+        values.append(value)
+    return hashlib.blake2b(repr(values).encode("utf-8"), digest_size=16).digest()
+
+
+def iter_workbook_chunks(file_path, chunksize=10000, sheet_name=0, columns=None, unique_rows=False):
+    """
+    Yield the sheet as consecutive DataFrames of at most `chunksize` rows.
+
+    Rows are read through openpyxl's read-only iterator, so only the current chunk
+    is held in memory regardless of how large the sheet is. `columns` projects and
+    casts each chunk as in read_workbook.
+
+    `unique_rows` drops rows that repeat an earlier row in any chunk, comparing every
+    sheet column as read_workbook does. It is checked on the raw cell values, before
+    each chunk's dtypes are inferred, and costs one 16-byte digest per distinct row
+    (about 100 bytes with the set's overhead): dedupe memory grows with the number of
+    distinct rows, while the rows themselves are still only held a chunk at a time.
+    """
+    workbook = load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        sheet = workbook.worksheets[sheet_name] if isinstance(sheet_name, int) else workbook[sheet_name]
+        rows = sheet.iter_rows(values_only=True)
+
+        header = next(rows, None)
+        if header is None:
+            return
+        header = [str(name) if name is not None else f"Unnamed: {i}" for i, name in enumerate(header)]
+        positions = [i for i, name in enumerate(header) if columns is None or name in columns]
+        names = [header[i] for i in positions]
+
+        def to_frame(chunk):
+            data = pd.DataFrame(chunk, columns=names)
+            return _apply_dtypes(data, columns) if columns is not None else data
+
+        seen = set()
+        chunk = []
+        for row in rows:
+            if all(value is None for value in row):
+                continue
+            if unique_rows:
+                key = _row_key(row)
+                if key in seen:
+                    continue
+                seen.add(key)
+            chunk.append(tuple(row[i] if i < len(row) else None for i in positions))
+            if len(chunk) >= chunksize:
+                yield to_frame(chunk)
+                chunk = []
+        if chunk:
+            yield to_frame(chunk)
+    finally:
+        workbook.close()
@@ -0,0 +1,117 @@
+import queue
+import threading
+import time
+from utils import log_message
+
+_DONE = object()
+
+
+class WriterThread:
+    """
+    Dedicated database writer fed through a bounded queue.
+
+    Producers `put(key, records)` and move on; the writer thread collects records into
+    batches of `batch_size` (or whatever arrived within `flush_interval` seconds) and
+    hands each to `write_batch(session, records)`, which returns the rows written or
+    None on failure. When the writer falls behind, the queue fills and `put` blocks,
+    so producers slow down instead of piling up parts in memory.
+
+    Outcomes come back through `completed()` as (keys, records, written) in the
+    producer's thread, so per-key bookkeeping never has to be shared across threads.
+    """
+
+    def __init__(self, session_factory, write_batch, batch_size=500, max_queued=1000, flush_interval=2.0,
+                 name="Writer"):
+        self.session_factory = session_factory
+        self.write_batch = write_batch
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.name = name
+        self._queue = queue.Queue(maxsize=max_queued)
+        self._completed = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._closed = False
+        self.error = None
+        self.batches = 0
+        self.written = 0
+        self.put_wait = 0.0
+        self.write_seconds = 0.0
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def put(self, key, records):
+        """Queue one producer item, blocking while the queue is full."""
+        if self.error is not None:
+            raise RuntimeError(f"{self.name} thread stopped: {self.error}")
+        started = time.perf_counter()
+        self._queue.put((key, records))
+        self.put_wait += time.perf_counter() - started
+
+    def completed(self):
+        """Return the batch outcomes reported since the last call, without waiting."""
+        outcomes = []
+        while True:
+            try:
+                outcomes.append(self._completed.get_nowait())
+            except queue.Empty:
+                return outcomes
+
+    def close(self):
+        """Write whatever is still queued, stop the thread and return the remaining outcomes."""
+        if not self._closed:
+            self._closed = True
+            self._queue.put(_DONE)
+            self._thread.join()
+            log_message(
+                f"[{self.name}] {self.written} rows in {self.batches} batches; "
+                f"{self.write_seconds:.1f}s writing, producers blocked {self.put_wait:.1f}s on a full queue"
+            )
+        return self.completed()
+
+    def _flush(self, session, keys, records):
+        started = time.perf_counter()
+        written = self.write_batch(session, records) if records else 0
+        self.write_seconds += time.perf_counter() - started
+        self.batches += 1
+        self.written += written or 0
+        self._completed.put((keys, records, written))
+
+    def _run(self):
+        session = self.session_factory()
+        keys, records = [], []
+        # When the current partial batch must be written even if it isn't full
+        deadline = None
+        try:
+            while True:
+                timeout = self.flush_interval if deadline is None else max(0.0, deadline - time.monotonic())
+                try:
+                    item = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    item = None
+                if item is _DONE:
+                    break
+                if item is not None:
+                    key, item_records = item
+                    keys.append(key)
+                    records.extend(item_records)
+                    if deadline is None:
+                        deadline = time.monotonic() + self.flush_interval
+                if keys and (len(records) >= self.batch_size or time.monotonic() >= deadline):
+                    self._flush(session, keys, records)
+                    keys, records, deadline = [], [], None
+            if keys:
+                self._flush(session, keys, records)
+        except Exception as e:
+            self.error = e
+            log_message(f"[{self.name}] Writer failed: {e}")
+            self._completed.put((keys, records, None))
+            # Keep draining so producers blocked on put() can finish; report those items as failed
+            while True:
+                item = self._queue.get()
+                if item is _DONE:
+                    break
+                self._completed.put(([item[0]], item[1], None))
+        finally:
+            session.close()
@@ -0,0 +1,61 @@
+import os
+import sys
+import uuid
+import pytest
+
+# The migration modules import each other as top-level modules from src/
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+
+def pytest_configure(config):
+    config.addinivalue_line("markers", "db: needs a Postgres database configured through TEOALIDA_DB_*")
+
+
+def pytest_collection_modifyitems(config, items):
+    # Database tests run only against an explicitly configured (throwaway) database,
+    # never the one config.json points at
+    if "TEOALIDA_DB_HOST" in os.environ:
+        return
+    skip = pytest.mark.skip(reason="set TEOALIDA_DB_HOST and the other TEOALIDA_DB_* variables to run")
+    for item in items:
+        if "db" in item.keywords:
+            item.add_marker(skip)
+
+
+@pytest.fixture
+def response_cache(tmp_path, monkeypatch):
+    """A fresh on-disk response cache in a temporary directory."""
+    import response_cache as module
+    cache = module.ResponseCache(tmp_path / "responses")
+    monkeypatch.setattr(module, "_cache", cache)
+    return cache
+
+
+@pytest.fixture
+def stub_search(response_cache):
+    """A local stand-in for the parts search; see stub_search.StubSearch."""
+    pytest.importorskip("aiohttp")
+    from stub_search import StubSearch
+    server = StubSearch()
+    yield server
+    server.close()
+
+
+@pytest.fixture
+def db_engine():
+    """An engine whose connections work in a schema of their own, dropped after the test."""
+    sqlalchemy = pytest.importorskip("sqlalchemy")
+    from db_connection import database_url, load_config
+    schema = f"teoalida_test_{uuid.uuid4().hex[:12]}"
+    admin = sqlalchemy.create_engine(database_url(load_config()))
+    with admin.begin() as connection:
+        connection.execute(sqlalchemy.text(f"CREATE SCHEMA {schema}"))
+    engine = sqlalchemy.create_engine(database_url(load_config()),
+                                      connect_args={"options": f"-csearch_path={schema}"})
+    try:
+        yield engine
+    finally:
+        engine.dispose()
+        with admin.begin() as connection:
+            connection.execute(sqlalchemy.text(f"DROP SCHEMA {schema} CASCADE"))
+        admin.dispose()
@@ -0,0 +1,52 @@
+import asyncio
+import threading
+import time
+from collections import defaultdict
+from aiohttp import web
+
+PAGE = """<html><body><script>
+var tracking = {"products": [{"name": "Engine Control Module", "sku": "%s"}]}; var digitalData = {};
+</script></body></html>"""
+
+
+class StubSearch:
+    """
+    The parts search served from a local aiohttp server on its own thread.
+
+    Responses depend on the requested model: "flaky" fails twice with 503 before
+    answering, "down" always fails with 500, "missing" is a 404, "garbled" isn't valid
+    UTF-8, and any other model gets a page with one part.
+    """
+
+    def __init__(self):
+        self.hits = defaultdict(list)
+        app = web.Application()
+        app.router.add_get("/{host}/search", self.search)
+        self._loop = asyncio.new_event_loop()
+        self._runner = web.AppRunner(app)
+        self._loop.run_until_complete(self._runner.setup())
+        site = web.TCPSite(self._runner, "127.0.0.1", 0)
+        self._loop.run_until_complete(site.start())
+        port = self._runner.addresses[0][1]
+        self.search_url = f"http://127.0.0.1:{port}/{{host}}/search"
+        self._thread = threading.Thread(target=self._loop.run_forever, daemon=True)
+        self._thread.start()
+
+    async def search(self, request):
+        host, model = request.match_info["host"], request.query["model"]
+        self.hits[(host, model)].append(time.monotonic())
+        if model == "flaky" and len(self.hits[(host, model)]) <= 2:
+            return web.Response(status=503)
+        if model == "down":
+            return web.Response(status=500)
+        if model == "missing":
+            return web.Response(status=404)
+        if model == "garbled":
+            return web.Response(body=b"\xff\xfe\xfa broken", content_type="text/html", charset="utf-8")
+        return web.Response(text=PAGE % f"{host}-{model}", content_type="text/html")
+
+    def close(self):
+        asyncio.run_coroutine_threadsafe(self._runner.cleanup(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
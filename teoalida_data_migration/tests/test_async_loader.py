@@ -0,0 +1,172 @@
+import asyncio
+import uuid
+import pytest
+
+asyncpg = pytest.importorskip("asyncpg")
+
+from async_loader import copy_upsert
+from db_connection import load_config
+from scrape_pool import ScrapeTarget
+from scrape_queue import ScrapeQueue
+
+pytestmark = pytest.mark.db
+
+# Just the columns scrape_and_load_async writes, without the rest of the schema
+ECU_SCHEMA = """
+CREATE TABLE vehicles (id uuid PRIMARY KEY);
+CREATE TABLE "ECU_version" (
+    id uuid PRIMARY KEY,
+    vehicle_id uuid NOT NULL REFERENCES vehicles (id),
+    name varchar(255),
+    part_number varchar(100) UNIQUE,
+    created_at timestamp,
+    updated_at timestamp
+);
+"""
+
+
+async def connect_pool(schema, max_size=1, **options):
+    config = load_config()
+    return await asyncpg.create_pool(user=config["user"], password=config["password"], host=config["host"],
+                                     port=int(config["port"]), database=config["dbname"], min_size=1,
+                                     max_size=max_size, server_settings={"search_path": schema})
+
+
+async def execute(schema, sql):
+    pool = await connect_pool(schema)
+    try:
+        return await pool.execute(sql)
+    finally:
+        await pool.close()
+
+
+async def fetch(schema, sql):
+    pool = await connect_pool(schema)
+    try:
+        return [tuple(row) for row in await pool.fetch(sql)]
+    finally:
+        await pool.close()
+
+
+@pytest.fixture
+def schema():
+    """A schema of its own for each test, dropped afterwards."""
+    name = f"teoalida_test_{uuid.uuid4().hex[:12]}"
+    asyncio.run(execute("public", f"CREATE SCHEMA {name}"))
+    yield name
+    asyncio.run(execute("public", f"DROP SCHEMA {name} CASCADE"))
+
+
+@pytest.fixture
+def ecu_loader(schema, monkeypatch):
+    """ECU_version with create_pool pointed at the test schema, and one vehicle per model."""
+    ECU_version = pytest.importorskip("ECU_version")
+    asyncio.run(execute(schema, ECU_SCHEMA))
+
+    async def create_pool(bulk=False, min_size=1, max_size=4):
+        return await connect_pool(schema, max_size)
+
+    monkeypatch.setattr(ECU_version, "create_pool", create_pool)
+    return ECU_version
+
+
+def vehicle_targets(schema, make, models):
+    targets = [ScrapeTarget(make, model, 2020, uuid.uuid4()) for model in models]
+    asyncio.run(execute(schema, "INSERT INTO vehicles VALUES " + ", ".join(f"('{t.vehicle_id}')" for t in targets)))
+    return targets
+
+
+def test_copy_upsert_skips_conflicts_and_counts_inserted_rows(schema):
+    async def run():
+        pool = await connect_pool(schema)
+        try:
+            await pool.execute("CREATE TABLE parts (id int PRIMARY KEY, part_number text UNIQUE, "
+                               "note text DEFAULT 'default')")
+            columns = ["id", "part_number"]
+            counts = [
+                await copy_upsert(pool, "parts", columns, [(1, "A"), (2, "B")], conflict_columns=["part_number"]),
+                await copy_upsert(pool, "parts", columns, [(3, "B"), (4, "C")], conflict_columns=["part_number"]),
+                # Without conflict columns any unique violation is skipped
+                await copy_upsert(pool, "parts", columns, [(1, "D")]),
+                await copy_upsert(pool, "parts", columns, []),
+            ]
+            rows = [tuple(row) for row in await pool.fetch("SELECT id, part_number, note FROM parts ORDER BY id")]
+            # Same (only) connection: the staging table went away with the commit
+            staging = await pool.fetchval("SELECT to_regclass('pg_temp.copy_staging')")
+            return counts, rows, staging
+        finally:
+            await pool.close()
+
+    counts, rows, staging = asyncio.run(run())
+    assert counts == [2, 1, 0, 0]
+    assert rows == [(1, "A", "default"), (2, "B", "default"), (4, "C", "default")]
+    assert staging is None
+
+
+def test_scrape_and_load_async_stores_parts_and_settles_the_queue(ecu_loader, schema, stub_search, tmp_path):
+    targets = vehicle_targets(schema, "Honda", ["ok1", "ok2", "ok3", "missing"])
+    # Already in the table though not in the preloaded set: skipped by ON CONFLICT
+    asyncio.run(execute(schema, f"""INSERT INTO "ECU_version" (id, vehicle_id, part_number)
+                                    VALUES ('{uuid.uuid4()}', '{targets[0].vehicle_id}',
+                                            'honda.oempartsonline.com-ok1')"""))
+    queue = ScrapeQueue(str(tmp_path / "queue.sqlite"))
+    queue.add(targets)
+    claimed = queue.claim(10)
+
+    fallback = asyncio.run(ecu_loader.scrape_and_load_async(
+        claimed, set(), queue, batch_size=2, search_url=stub_search.search_url, max_retries=0))
+
+    assert [t.model for t in fallback] == ["missing"]
+    rows = asyncio.run(fetch(schema, 'SELECT part_number, name FROM "ECU_version" ORDER BY part_number'))
+    assert rows == [("honda.oempartsonline.com-ok1", None),
+                    ("honda.oempartsonline.com-ok2", "Engine Control Module"),
+                    ("honda.oempartsonline.com-ok3", "Engine Control Module")]
+    # The fallback target stays claimed for the browser retry
+    assert queue.counts()["done"] == 3
+    assert queue.counts()["in_flight"] == 1
+    queue.close()
+
+
+def test_scrape_failure_finishes_started_copies_and_fails_the_rest(ecu_loader, schema, tmp_path, monkeypatch):
+    targets = vehicle_targets(schema, "Honda", ["first", "second", "third"])
+    queue = ScrapeQueue(str(tmp_path / "queue.sqlite"))
+    queue.add(targets)
+    claimed = queue.claim(10)
+
+    async def failing_scrape(targets, client, max_pending=None):
+        for t in targets[:2]:
+            yield t, [{"name": "ECU", "part_number": f"part-{t.model}"}]
+        raise RuntimeError("scraper broke")
+
+    monkeypatch.setattr(ecu_loader, "scrape_targets", failing_scrape)
+    with pytest.raises(RuntimeError):
+        asyncio.run(ecu_loader.scrape_and_load_async(claimed, set(), queue, batch_size=1))
+
+    rows = asyncio.run(fetch(schema, 'SELECT part_number FROM "ECU_version" ORDER BY part_number'))
+    assert rows == [("part-first",), ("part-second",)]
+    counts = queue.counts()
+    assert counts["done"] == 2
+    # Never scraped: still claimed, for release() or the lease to hand back
+    assert counts["in_flight"] == 1
+    queue.close()
+
+
+def test_scrape_failure_marks_the_unwritten_batch_failed(ecu_loader, schema, tmp_path, monkeypatch):
+    targets = vehicle_targets(schema, "Honda", ["first", "second"])
+    queue = ScrapeQueue(str(tmp_path / "queue.sqlite"))
+    queue.add(targets)
+    claimed = queue.claim(10)
+
+    async def failing_scrape(targets, client, max_pending=None):
+        for t in targets:
+            yield t, [{"name": "ECU", "part_number": f"part-{t.model}"}]
+        raise RuntimeError("scraper broke")
+
+    monkeypatch.setattr(ecu_loader, "scrape_targets", failing_scrape)
+    with pytest.raises(RuntimeError):
+        asyncio.run(ecu_loader.scrape_and_load_async(claimed, set(), queue, batch_size=10))
+
+    assert asyncio.run(fetch(schema, 'SELECT part_number FROM "ECU_version"')) == []
+    # Failed once, so back to pending for another attempt
+    assert queue.counts()["pending"] == 2
+    queue.close()
@@ -0,0 +1,85 @@
+import json
+from contextlib import nullcontext
+from types import SimpleNamespace
+import pytest
+
+pytest.importorskip("sqlalchemy")
+
+from sqlalchemy.exc import IntegrityError, OperationalError
+from batch_writer import BatchWriter
+
+
+class FakeSession:
+    """Accepts a batch unless it holds a row marked bad; counts statements and commits."""
+
+    def __init__(self, error=IntegrityError):
+        self.error = error
+        self.rows = []
+        self.statements = 0
+        self.commits = 0
+        self.rollbacks = 0
+
+    def begin_nested(self):
+        return nullcontext()
+
+    def execute(self, records):
+        self.statements += 1
+        if any(record.get("bad") for record in records):
+            raise self.error("INSERT", {}, Exception(f"bad row {[r['id'] for r in records if r.get('bad')]}"))
+        self.rows.extend(record["id"] for record in records)
+        return SimpleNamespace(rowcount=len(records))
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        self.rollbacks += 1
+
+
+class RecordWriter(BatchWriter):
+    # The fake session takes the records themselves rather than a compiled INSERT
+    def _statement(self, records):
+        return records
+
+
+def rows(count, bad=()):
+    return [{"id": i, "bad": i in bad} for i in range(count)]
+
+
+def test_bisection_leaves_out_only_the_bad_rows(tmp_path):
+    session = FakeSession()
+    quarantine_file = str(tmp_path / "quarantine" / "parts.jsonl")
+    writer = RecordWriter(session, SimpleNamespace(name="parts"), batch_size=8, quarantine_file=quarantine_file)
+
+    assert writer.write(rows(8, bad={2, 5})) == 6
+    assert session.rows == [0, 1, 3, 4, 6, 7]
+    assert (writer.written, writer.quarantined, session.commits) == (6, 2, 1)
+    # 1 batch + 2 halves + 4 quarters + 4 single rows below the two failing quarters
+    assert session.statements == 11
+
+    with open(quarantine_file, encoding="utf-8") as file:
+        quarantined = [json.loads(line) for line in file]
+    assert [entry["row"]["id"] for entry in quarantined] == [2, 5]
+    assert quarantined[0]["table"] == "parts"
+
+
+def test_batches_are_flushed_at_batch_size_and_on_exit():
+    session = FakeSession()
+    with RecordWriter(session, SimpleNamespace(name="parts"), batch_size=3) as writer:
+        for record in rows(7):
+            writer.add(record)
+        assert session.commits == 2
+    assert session.commits == 3
+    assert writer.written == 7
+
+
+@pytest.mark.parametrize("error, bad", [(OperationalError, {1}), (IntegrityError, {0, 1, 2, 3})])
+def test_batch_wide_failures_are_raised_without_quarantining(tmp_path, error, bad):
+    session = FakeSession(error=error)
+    quarantine_file = tmp_path / "parts.jsonl"
+    writer = RecordWriter(session, SimpleNamespace(name="parts"), quarantine_file=str(quarantine_file))
+
+    with pytest.raises(error):
+        writer.write(rows(4, bad=bad))
+    assert (session.commits, session.rollbacks, writer.written, writer.quarantined) == (0, 1, 0, 0)
+    assert not quarantine_file.exists()
@@ -0,0 +1,63 @@
+import uuid
+from datetime import date, datetime
+import pytest
+
+pd = pytest.importorskip("pandas")
+
+from bulk_loader import format_copy_value, partition_frame
+
+
+def test_partitions_cover_the_frame_and_keep_keys_together():
+    data = pd.DataFrame({"make": ["Honda", "Toyota", "Honda", "Ford", "Toyota"] * 20, "row": range(100)})
+    parts = partition_frame(data, 3, key_columns=["make"])
+
+    assert len(parts) == 3
+    assert sorted(row for part in parts for row in part["row"]) == list(range(100))
+    # Each make lands in exactly one part
+    assert sum(part["make"].nunique() for part in parts) == 3
+
+
+def test_partitioning_ignores_the_index():
+    data = pd.DataFrame({"make": ["Honda", "Toyota", "Ford"]})
+    shifted = data.set_axis([10, 20, 30])
+    assert [len(part) for part in partition_frame(data, 2)] == [len(part) for part in partition_frame(shifted, 2)]
+
+
+def test_staging_rejects_parallel_loading():
+    migrate_vehicle = pytest.importorskip("migrate_vehicle")
+    with pytest.raises(ValueError):
+        migrate_vehicle.migrate_vehicle_data("missing.xlsx", staging=True, parallel=4)
+
+
+@pytest.mark.parametrize("value, text", [
+    (None, "\\N"),
+    (pd.NA, "\\N"),
+    (pd.NaT, "\\N"),
+    (float("nan"), "\\N"),
+    # Ints that went through a NaN column
+    (2020.0, "2020"),
+    (1.5, "1.5"),
+    (uuid.UUID(int=1), "00000000-0000-0000-0000-000000000001"),
+    (datetime(2024, 1, 2, 3, 4, 5), "2024-01-02 03:04:05"),
+    (pd.Timestamp("2024-01-02 03:04:05"), "2024-01-02 03:04:05"),
+    (date(2024, 1, 2), "2024-01-02"),
+    ("", ""),
+    ("Gas", "Gas"),
+    (4, 4),
+])
+def test_copy_values(value, text):
+    assert format_copy_value(value) == text
+
+
+def test_parallel_loads_get_a_pool_with_a_connection_per_partition(monkeypatch):
+    migrate_vehicle = pytest.importorskip("migrate_vehicle")
+    requested = []
+
+    def get_db_connection(mode="default", **pool_options):
+        requested.append((mode, pool_options))
+        raise RuntimeError("no database")
+
+    monkeypatch.setattr(migrate_vehicle, "get_db_connection", get_db_connection)
+    with pytest.raises(RuntimeError):
+        migrate_vehicle.migrate_vehicle_data("missing.xlsx", parallel=20)
+    assert requested == [("bulk", {"pool_size": 21})]
@@ -0,0 +1,93 @@
+import pytest
+
+sqlalchemy = pytest.importorskip("sqlalchemy")
+pytest.importorskip("psycopg2")
+
+from sqlalchemy import text
+from bulk_maintenance import RebuildError, deferred_maintenance
+
+pytestmark = pytest.mark.db
+
+SCHEMA = """
+CREATE TABLE parent (id int PRIMARY KEY);
+CREATE TABLE child (
+    id int PRIMARY KEY,
+    parent_id int REFERENCES parent (id),
+    code text UNIQUE,
+    note text
+);
+CREATE INDEX child_note ON child (note);
+INSERT INTO parent VALUES (1);
+"""
+
+
+@pytest.fixture
+def engine(db_engine):
+    with db_engine.begin() as connection:
+        connection.execute(text(SCHEMA))
+    return db_engine
+
+
+def secondary_objects(engine):
+    with engine.connect() as connection:
+        indexes = connection.execute(text(
+            "SELECT indexname FROM pg_indexes WHERE tablename = 'child' AND indexname <> 'child_pkey'"
+        )).scalars().all()
+        constraints = connection.execute(text(
+            "SELECT conname, convalidated FROM pg_constraint "
+            "WHERE conrelid = 'child'::regclass AND contype IN ('u', 'f')"
+        )).all()
+    return sorted(indexes), sorted(constraints)
+
+
+def insert(engine, rows):
+    with engine.begin() as connection:
+        connection.execute(text("INSERT INTO child VALUES (:id, :parent_id, :code, :note)"), rows)
+
+
+def test_objects_are_dropped_during_the_load_and_restored_after(engine):
+    before = secondary_objects(engine)
+    with deferred_maintenance(engine, "child"):
+        assert secondary_objects(engine) == ([], [])
+        insert(engine, [{"id": 1, "parent_id": 1, "code": "a", "note": "x"}])
+    assert secondary_objects(engine) == before
+
+
+def test_kept_columns_keep_their_index(engine):
+    with deferred_maintenance(engine, "child", keep_columns=["code"]):
+        indexes, constraints = secondary_objects(engine)
+        assert indexes == ["child_code_key"]
+        assert [name for name, _ in constraints] == ["child_code_key"]
+
+
+def test_a_failed_rebuild_leaves_the_others_in_place(engine):
+    with pytest.raises(RebuildError) as raised:
+        with deferred_maintenance(engine, "child"):
+            insert(engine, [
+                {"id": 1, "parent_id": 1, "code": "dup", "note": "x"},
+                {"id": 2, "parent_id": 1, "code": "dup", "note": "y"},
+                # Orphan: the foreign key comes back but can't be validated
+                {"id": 3, "parent_id": 99, "code": "c", "note": "z"},
+            ])
+
+    assert [statement.split()[-1] for statement, _ in raised.value.failures] == ['(code)', '"child_parent_id_fkey"']
+    indexes, constraints = secondary_objects(engine)
+    assert indexes == ["child_note"]
+    assert constraints == [("child_parent_id_fkey", False)]
+
+
+def test_rebuild_failures_are_chained_to_the_load_error(engine):
+    with pytest.raises(RebuildError) as raised:
+        with deferred_maintenance(engine, "child"):
+            insert(engine, [{"id": 1, "parent_id": 1, "code": "dup", "note": "x"},
+                            {"id": 2, "parent_id": 1, "code": "dup", "note": "y"}])
+            raise ValueError("load failed")
+    assert isinstance(raised.value.__cause__, ValueError)
+
+
+def test_a_failed_load_is_raised_as_is_when_everything_is_restored(engine):
+    before = secondary_objects(engine)
+    with pytest.raises(ValueError):
+        with deferred_maintenance(engine, "child"):
+            raise ValueError("load failed")
+    assert secondary_objects(engine) == before
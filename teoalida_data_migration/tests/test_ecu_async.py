@@ -0,0 +1,123 @@
+import asyncio
+import time
+import pytest
+
+pytest.importorskip("aiohttp")
+
+from ecu_async import AsyncSearchClient, TokenBucket, iter_async_results, scrape_targets
+from scrape_pool import ScrapeTarget
+
+
+def target(make, model):
+    return ScrapeTarget(make, model, 2020, f"vehicle-{make}-{model}")
+
+
+async def collect(targets, **client_options):
+    async with AsyncSearchClient(**client_options) as client:
+        return {t.model: parts async for t, parts in scrape_targets(targets, client)}
+
+
+def test_token_bucket_spaces_requests_after_the_burst():
+    async def acquire_all():
+        bucket = TokenBucket(rate=20, burst=2)
+        started = time.monotonic()
+        for _ in range(6):
+            await bucket.acquire()
+        return time.monotonic() - started
+
+    # Two tokens are there up front; the other four arrive at 20 per second
+    assert asyncio.run(acquire_all()) >= 4 / 20 - 0.02
+
+
+def test_requests_to_one_host_are_rate_limited(stub_search):
+    targets = [target("Toyota", f"model-{n}") for n in range(5)]
+    results = asyncio.run(collect(targets, search_url=stub_search.search_url, per_host_rate=10, per_host_burst=1))
+
+    assert all(results[t.model] for t in targets)
+    arrivals = sorted(times[0] for times in stub_search.hits.values())
+    assert arrivals[-1] - arrivals[0] >= 4 / 10 - 0.05
+
+
+def test_retries_and_failures_are_reported_per_target(stub_search):
+    targets = [target("Honda", model) for model in ("ok", "flaky", "down", "missing", "garbled")]
+    results = asyncio.run(collect(targets, search_url=stub_search.search_url, max_retries=3, backoff_base=0.01))
+
+    assert results["ok"] == [{"name": "Engine Control Module", "part_number": "honda.oempartsonline.com-ok"}]
+    assert results["flaky"][0]["part_number"] == "honda.oempartsonline.com-flaky"
+    assert len(stub_search.hits[("honda.oempartsonline.com", "flaky")]) == 3
+    # Retryable statuses are tried max_retries + 1 times, the rest once
+    assert results["down"] is None
+    assert len(stub_search.hits[("honda.oempartsonline.com", "down")]) == 4
+    assert results["missing"] is None
+    assert len(stub_search.hits[("honda.oempartsonline.com", "missing")]) == 1
+    # An undecodable page fails only its own target
+    assert results["garbled"] is None
+
+
+def test_only_pages_with_parts_are_cached(stub_search, response_cache):
+    targets = [target("Mazda", "ok"), target("Mazda", "missing")]
+    asyncio.run(collect(targets, search_url=stub_search.search_url))
+    asyncio.run(collect(targets, search_url=stub_search.search_url))
+
+    assert len(stub_search.hits[("mazda.oempartsonline.com", "ok")]) == 1
+    assert len(stub_search.hits[("mazda.oempartsonline.com", "missing")]) == 2
+
+
+def test_unfetched_targets_fall_back_to_the_browser(stub_search, monkeypatch):
+    ECU_version = pytest.importorskip("ECU_version")
+    browser_targets = []
+
+    def fake_scrape_pool(targets, scrape, make_driver, *args):
+        for t in targets:
+            browser_targets.append(t)
+            yield t, [{"name": "From browser", "part_number": t.model}]
+
+    monkeypatch.setattr(ECU_version, "run_scrape_pool", fake_scrape_pool)
+    targets = [target("Kia", "ok"), target("Kia", "missing"), target("Kia", "garbled")]
+    results = dict(ECU_version.scrape_results(targets, backend="async", search_url=stub_search.search_url))
+
+    assert sorted(t.model for t in browser_targets) == ["garbled", "missing"]
+    assert results[targets[0]][0]["part_number"] == "kia.oempartsonline.com-ok"
+    assert results[targets[1]] == [{"name": "From browser", "part_number": "missing"}]
+
+    browser_targets.clear()
+    results = dict(ECU_version.scrape_results(targets[1:], backend="async", search_url=stub_search.search_url,
+                                              browser_fallback=False))
+    assert browser_targets == []
+    assert results == {targets[1]: None, targets[2]: None}
+
+
+def test_max_pending_bounds_fetches_in_flight():
+    class CountingClient:
+        in_flight = peak = 0
+
+        async def fetch_parts(self, target):
+            self.in_flight += 1
+            self.peak = max(self.peak, self.in_flight)
+            await asyncio.sleep(0.01)
+            self.in_flight -= 1
+            return []
+
+    async def consume_slowly(client):
+        results = []
+        async for item in scrape_targets([target("Audi", f"model-{n}") for n in range(10)], client, max_pending=3):
+            results.append(item)
+            # A consumer busy elsewhere (e.g. waiting for a COPY slot) starts no new fetches
+            await asyncio.sleep(0.02)
+        return results
+
+    client = CountingClient()
+    assert len(asyncio.run(consume_slowly(client))) == 10
+    assert client.peak == 3
+
+
+def test_a_stalled_consumer_pauses_the_threaded_scrape(stub_search):
+    targets = [target("Kia", f"model-{n}") for n in range(200)]
+    results = iter_async_results(targets, max_pending=5, search_url=stub_search.search_url,
+                                 per_host_rate=1000, per_host_burst=1000)
+    next(results)
+    time.sleep(0.5)
+    fetched = len(stub_search.hits)
+    results.close()
+    # The window in flight, the full hand-off queue and the item being handed over
+    assert fetched <= 5 + 5 + 2
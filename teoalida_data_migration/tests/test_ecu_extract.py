@@ -0,0 +1,67 @@
+import pytest
+
+pytest.importorskip("bs4")
+
+import ecu_extract
+from ecu_extract import EXTRACTORS, configure_extractor, parse_product_blocks, parse_search_page
+
+BLOCK = """<div class="product-details-col">
+  <div class="product-title"><a href="/p/{number}"><h2> {name} </h2></a></div>
+  <div class="catalog-product-id"><a href="/p/{number}">{number}</a></div>
+</div>"""
+
+RENDERED_PAGE = "<!DOCTYPE html><html><body>{}</body></html>".format("".join([
+    BLOCK.format(name="Engine Control Module", number="89661-0R010"),
+    BLOCK.format(name="Transmission Control Module", number="89530-42010"),
+    # No part number: left out
+    '<div class="product-details-col"><div class="product-title"><a><h2>Sensor</h2></a></div></div>',
+]))
+
+RENDERED_PARTS = [
+    {"name": "Engine Control Module", "part_number": "89661-0R010"},
+    {"name": "Transmission Control Module", "part_number": "89530-42010"},
+]
+
+
+@pytest.mark.parametrize("extractor", list(EXTRACTORS))
+def test_every_backend_reads_the_rendered_blocks(extractor):
+    assert parse_product_blocks(RENDERED_PAGE, extractor) == RENDERED_PARTS
+    assert parse_product_blocks("", extractor) == []
+    assert parse_product_blocks("<html><body>No results</body></html>", extractor) == []
+
+
+@pytest.mark.parametrize("extractor", list(EXTRACTORS))
+def test_tracking_json_is_preferred_over_the_blocks(extractor):
+    page = RENDERED_PAGE.replace("<body>", """<body><script>
+        var tracking = {"page": "search", "products": [{"name": "ECU", "sku": "12345"}]};
+        var digitalData = {};</script>""")
+    assert parse_search_page(page, extractor) == [{"name": "ECU", "part_number": "12345"}]
+    assert parse_search_page(RENDERED_PAGE, extractor) == RENDERED_PARTS
+
+
+def test_an_unavailable_extractor_falls_back_with_a_warning(monkeypatch, capsys):
+    monkeypatch.setattr(ecu_extract, "UNAVAILABLE_EXTRACTORS", {"selectolax": "needs selectolax"})
+    monkeypatch.setattr(ecu_extract, "EXTRACTORS", {"bs4": EXTRACTORS["bs4"]})
+    monkeypatch.setattr(ecu_extract, "_extractor", "bs4")
+
+    assert configure_extractor("selectolax") == "bs4"
+    assert configure_extractor("auto") == "bs4"
+    assert "Extractor 'selectolax' is unavailable (needs selectolax)" in capsys.readouterr().out
+    assert parse_product_blocks(RENDERED_PAGE, "selectolax") == RENDERED_PARTS
+    with pytest.raises(ValueError):
+        configure_extractor("html5lib")
+
+
+def test_products_without_a_part_number_are_skipped():
+    products = [
+        {"name": "ECU", "sku": "89661-0R010", "id": 991},
+        {"name": "TCM", "partNumber": " 89530-42010 "},
+        # Shop product ids only: no part number
+        {"name": "Sensor", "id": 992, "product_id": "p-992"},
+        {"sku": "no-name"},
+        "not a product",
+    ]
+    assert ecu_extract.products_to_parts(products) == [
+        {"name": "ECU", "part_number": "89661-0R010"},
+        {"name": "TCM", "part_number": "89530-42010"},
+    ]
@@ -0,0 +1,36 @@
+import pytest
+
+pytest.importorskip("sqlalchemy")
+
+import run_migrations
+from run_migrations import create_schema, select_stages
+
+
+def test_selected_stages_bring_their_dependencies_in_pipeline_order():
+    assert select_stages(["models", "fuel_types"]) == ["manufacturers", "models", "fuel_types"]
+    with pytest.raises(ValueError):
+        select_stages(["vehicle"])
+
+
+@pytest.mark.db
+def test_tables_are_created_before_the_stages_start(db_engine, monkeypatch):
+    from sqlalchemy import inspect
+    monkeypatch.setattr(run_migrations, "get_db_connection", lambda *args, **kwargs: db_engine)
+
+    create_schema()
+    # A second run, like each stage's own create_all, finds nothing left to create
+    create_schema()
+    tables = set(inspect(db_engine).get_table_names())
+    assert {"manufacturers", "models", "fuel_types", "body_types", "trans_types", "drive_train_types",
+            "engine_types", "ee_architectures"} <= tables
+
+
+def test_pooled_engines_are_disposed_when_the_pipeline_ends(monkeypatch):
+    disposed = []
+    monkeypatch.setattr(run_migrations, "read_workbook", lambda file_path: None)
+    monkeypatch.setattr(run_migrations, "create_schema", lambda: None)
+    monkeypatch.setattr(run_migrations, "dispose_engines", lambda: disposed.append(True))
+    monkeypatch.setitem(run_migrations.STAGES, "broken", (lambda file_path: 1 / 0, []))
+
+    assert run_migrations.run_pipeline("sheet.xlsx", ["broken"]) == {"broken": ("failed", pytest.approx(0, abs=1))}
+    assert disposed == [True]
@@ -0,0 +1,104 @@
+import uuid
+import pytest
+
+from scrape_pool import ScrapeTarget
+from scrape_queue import ScrapeQueue
+
+
+@pytest.fixture
+def queue(tmp_path):
+    queue = ScrapeQueue(str(tmp_path / "queue.sqlite"), max_attempts=2, worker="test")
+    yield queue
+    queue.close()
+
+
+def target(model, year=2020, vehicle_id=None):
+    return ScrapeTarget("Honda", model, year, vehicle_id or uuid.uuid4())
+
+
+def test_targets_are_added_once_and_claimed_once(queue):
+    targets = [target("Civic"), target("Accord", 2021.0)]
+    assert queue.add(targets) == 2
+    assert queue.add(targets + [target("Civic")]) == 0
+
+    claimed = queue.claim(10)
+    assert sorted((t.model, t.year) for t in claimed) == [("Accord", 2021), ("Civic", 2020)]
+    assert {t.vehicle_id for t in claimed} == {t.vehicle_id for t in targets}
+    assert queue.claim(10) == []
+
+    queue.mark_done(claimed[:1])
+    assert queue.counts() == {"pending": 0, "in_flight": 1, "done": 1, "failed": 0}
+
+
+def test_failed_targets_are_retried_until_out_of_attempts(queue):
+    queue.add([target("Civic")])
+    queue.mark_failed(queue.claim(1), "timeout")
+    assert queue.counts()["pending"] == 1
+    queue.mark_failed(queue.claim(1), "timeout")
+    assert queue.counts()["failed"] == 1
+    assert queue.claim(1) == []
+
+    assert queue.retry_failed() == 1
+    assert len(queue.claim(1)) == 1
+
+
+def test_released_and_expired_claims_are_handed_out_again(tmp_path, queue):
+    queue.add([target("Civic"), target("Accord")])
+    queue.claim(1)
+    assert queue.release() == 1
+    assert queue.counts()["pending"] == 2
+
+    other = ScrapeQueue(queue.path, lease=0, worker="other")
+    claimed = queue.claim(2)
+    # The lease has run out, so another worker takes them over
+    assert [t.model for t in other.claim(2)] == [t.model for t in claimed]
+    other.close()
+
+
+def test_unfinished_targets_follow_reloaded_vehicles(queue):
+    civic, accord, fit = target("Civic"), target("Accord"), target("Fit")
+    queue.add([civic, accord, fit])
+    queue.mark_done(queue.claim(10)[:1])
+
+    # The vehicles were reloaded: new ids, and no vehicle for the Fit any more
+    reloaded = [target(t.model) for t in (civic, accord)]
+    queue.add(reloaded)
+    assert queue.retire_missing(reloaded) == 1
+    queue.release()
+
+    claimed = {t.model: t.vehicle_id for t in queue.claim(10)}
+    done = next(t.model for t in (civic, accord) if t.model not in claimed)
+    assert claimed == {t.model: t.vehicle_id for t in reloaded if t.model != done}
+    assert queue.counts() == {"pending": 0, "in_flight": 1, "done": 1, "failed": 1}
+
+
+def test_rows_with_missing_fields_are_not_targets():
+    pd = pytest.importorskip("pandas")
+    ECU_version = pytest.importorskip("ECU_version")
+
+    class Index:
+        def find(self, model, manufacturer_id=None, year=None):
+            return uuid.UUID(int=year)
+
+    df_vehicles = pd.DataFrame({
+        "Make": ["Honda", "Honda", None, "Honda", "Honda"],
+        "Model": ["Civic", "Accord", "Fit", " ", "CR-V"],
+        "Year": [2020.0, float("nan"), 2020.0, 2020.0, "n/a"],
+    })
+    targets = ECU_version.build_scrape_targets(df_vehicles, Index(), {})
+    assert targets == [ScrapeTarget("Honda", "Civic", 2020, uuid.UUID(int=2020))]
+
+
+def test_replay_leaves_uncaptured_targets_for_a_live_run(queue, response_cache):
+    ECU_version = pytest.importorskip("ECU_version")
+    captured, uncaptured = target("Civic"), target("Accord")
+    response_cache.put(ECU_version.search_page_url(captured.make, captured.model, captured.year),
+                       "<html><body>No results</body></html>")
+    response_cache.replay = True
+    queue.add([captured, uncaptured])
+
+    results = list(ECU_version.replay_results(queue.claim(10)))
+    assert [(t.model, parts) for t, parts in results] == [("Civic", [])]
+    queue.mark_done([t for t, _ in results])
+    queue.release()
+    assert queue.counts() == {"pending": 1, "in_flight": 0, "done": 1, "failed": 0}
@@ -0,0 +1,53 @@
+from datetime import date
+import pytest
+
+pytest.importorskip("sqlalchemy")
+
+from vehicle_index import VehicleIndex, normalize_name
+
+HONDA, TOYOTA = 1, 2
+
+ROWS = [
+    ("Civic", HONDA, 2020, "civic-2020"),
+    ("Civic", HONDA, date(2021, 1, 1), "civic-2021"),
+    ("Civic  Type R", HONDA, 2020, "type-r"),
+    ("Accord Hybrid", HONDA, 2020, "accord-hybrid"),
+    ("New Accord", HONDA, 2019, "new-accord"),
+    ("Corolla", TOYOTA, 2020, "corolla"),
+    # Created from a vehicle row alone: no manufacturer
+    ("Corolla Cross", None, 2022, "corolla-cross"),
+    (None, HONDA, 2020, "nameless"),
+]
+
+
+@pytest.fixture
+def index():
+    return VehicleIndex(ROWS)
+
+
+def test_names_are_normalised():
+    assert normalize_name("  Civic\tType   R ") == "civic type r"
+
+
+def test_exact_names_win_and_prefer_the_year(index):
+    assert index.find("civic", HONDA, 2021) == "civic-2021"
+    assert index.find("CIVIC", HONDA, 2020.0) == "civic-2020"
+    # No vehicle of that year: the first one for the name
+    assert index.find("Civic", HONDA, 1999) == "civic-2020"
+
+
+def test_prefix_matches_come_before_substring_matches(index):
+    assert index.find("Accord", HONDA, 2019) == "accord-hybrid"
+    assert index.find("Civic Type", HONDA) == "type-r"
+    assert index.find("cord", HONDA, 2019) == "new-accord"
+
+
+def test_matches_are_scoped_to_the_make(index):
+    assert index.find("Civic", TOYOTA) is None
+    assert index.find("Corolla", HONDA, 2022) == "corolla-cross"
+    assert index.find("Corolla", None, 2022) == "corolla"
+
+
+def test_blank_or_unknown_names_find_nothing(index):
+    assert index.find("   ") is None
+    assert index.find("Prius") is None
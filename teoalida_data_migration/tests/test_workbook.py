@@ -0,0 +1,82 @@
+import pytest
+
+pytest.importorskip("openpyxl")
+
+import workbook
+from workbook import iter_workbook_chunks, read_workbook
+
+HEADER = ["Make", "Model", "Year", "Engine type "]
+ROWS = [
+    ["Toyota", "Corolla", 2020, "Gas"],
+    # Same make/model as above but another year: distinct sheet rows
+    ["Toyota", "Corolla", 2021, "Gas"],
+    ["Toyota", "Corolla", 2020, "Gas"],
+    ["Honda", 3, 2020, None],
+]
+
+COLUMNS = {
+    "Make": ("make", "category"),
+    "Model": ("model", object),
+    "Engine type ": ("engine", object),
+    "Doors": ("doors", None),
+}
+
+
+@pytest.fixture
+def sheet(tmp_path, monkeypatch):
+    from openpyxl import Workbook
+    monkeypatch.setattr(workbook, "_snapshots", {})
+    monkeypatch.setattr(workbook, "_unique_rows", {})
+    book = Workbook()
+    book.active.append(HEADER)
+    for row in ROWS:
+        book.active.append(row)
+    path = tmp_path / "sheet.xlsx"
+    book.save(path)
+    return str(path)
+
+
+@pytest.mark.parametrize("use_cache", [True, False])
+def test_projection_keeps_rows_that_differ_in_unread_columns(sheet, use_cache):
+    data = read_workbook(sheet, COLUMNS, use_cache=use_cache, unique_rows=True)
+
+    # Only the exact repeat of the first row goes, though rows 0-2 look alike once projected
+    assert list(data.index) == [0, 1, 3]
+    assert list(data.columns) == ["Make", "Model", "Engine type "]
+    assert data["Make"].dtype == "category"
+    assert len(read_workbook(sheet, COLUMNS, use_cache=use_cache)) == 4
+
+
+def test_snapshot_reads_match_a_fresh_parse(sheet):
+    first = read_workbook(sheet, COLUMNS, unique_rows=True)
+    workbook._snapshots.clear()
+    workbook._unique_rows.clear()
+    # Served from the on-disk snapshot this time
+    second = read_workbook(sheet, COLUMNS, unique_rows=True)
+    assert first.equals(second)
+
+
+def test_missing_declared_columns_are_logged(sheet, capsys):
+    read_workbook(sheet, COLUMNS)
+    assert "Sheet has no column(s) 'Doors'" in capsys.readouterr().out
+
+
+def test_chunks_cover_the_sheet_in_order(sheet):
+    chunks = list(iter_workbook_chunks(sheet, chunksize=3, columns=COLUMNS))
+    assert [len(chunk) for chunk in chunks] == [3, 1]
+    assert [row for chunk in chunks for row in chunk["Model"]] == ["Corolla", "Corolla", "Corolla", 3]
+
+
+def test_streamed_duplicates_are_dropped_across_chunks(tmp_path):
+    from openpyxl import Workbook
+    book = Workbook()
+    book.active.append(["Model", "Year", "Doors"])
+    for row in [["A", 2020, None], ["B", 2020, 4], ["A", 2020, None], ["B", 2020.0, 4.0], ["B", 2021, 4]]:
+        book.active.append(row)
+    path = str(tmp_path / "sheet.xlsx")
+    book.save(path)
+
+    # Repeats land in later chunks, and 2020.0/4.0 only match 2020/4 once whole floats are normalised
+    chunks = list(iter_workbook_chunks(path, chunksize=2, columns={"Model": ("model", object)}, unique_rows=True))
+    assert [list(chunk["Model"]) for chunk in chunks] == [["A", "B"], ["B"]]
+    assert sum(len(chunk) for chunk in chunks) == len(read_workbook(path, unique_rows=True))